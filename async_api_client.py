@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Async ERPNext API Client
+asyncio counterpart of ERPNextSecureClient built on a pooled aiohttp session
+"""
+
+import os
+import json
+import asyncio
+from datetime import datetime
+from urllib.parse import urlparse
+
+from secure_api_client import AuditLogWriter
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for the async client
+    aiohttp = None
+
+def _query_value(value):
+    """aiohttp only accepts str/int/float query values (not bool, a subclass of int)"""
+    if isinstance(value, bool):
+        return int(value)  # frappe reads flags such as as_dict as 0/1
+    if isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value)
+
+class AsyncERPNextClient:
+    """
+    Async ERPNext API Client with token and session authentication
+    One client keeps a pooled connector, so hundreds of calls can be in
+    flight from a single process. Use it as an async context manager or
+    call close() when done.
+    """
+
+    def __init__(self, base_url="http://localhost:8080", limit=100, limit_per_host=0,
+                 timeout=30, log_format="text"):
+        if aiohttp is None:
+            raise ImportError("AsyncERPNextClient requires aiohttp: pip install aiohttp")
+
+        self.base_url = base_url.rstrip('/')
+        self.auth_method = None
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session = None
+
+        # Security headers
+        self.headers = {
+            'User-Agent': 'ERPNext-Secure-Client/1.0',
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+
+        self.security_log = AuditLogWriter.for_path('api_security.log', fmt=log_format)
+        self.request_log = AuditLogWriter.for_path('api_requests.log', fmt=log_format)
+
+        if urlparse(base_url).scheme != 'https':
+            print("⚠️  WARNING: Using HTTP. Use HTTPS in production!")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def session(self):
+        """Pooled aiohttp session, created on first use inside the event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                # Accept cookies from IP hosts such as 127.0.0.1
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            )
+        return self._session
+
+    async def login_with_credentials(self, username=None, password=None):
+        """
+        Login using username/password (creates session cookie)
+        SECURITY: Use only for web applications, not for API clients
+        Never prompts: blocking on a terminal would stall the event loop.
+        """
+        if not (username and password):
+            print("❌ Username and password are required")
+            return False
+
+        login_data = {"usr": username, "pwd": password}
+
+        try:
+            async with self.session.post(f"{self.base_url}/api/method/login", json=login_data) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+
+            if "message" in result and "Logged In" in result["message"]:
+                self.auth_method = "session"
+                self.current_user = username
+                print("✅ Logged in successfully (session-based)")
+                self._log_auth_event("LOGIN_SUCCESS", username)
+                return True
+            else:
+                print("❌ Login failed")
+                self._log_auth_event("LOGIN_FAILED", username)
+                return False
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Login error: {e}")
+            self._log_auth_event("LOGIN_ERROR", username, str(e))
+            return False
+
+    async def authenticate_with_token(self, api_key=None, api_secret=None):
+        """
+        Setup token-based authentication
+        SECURITY: Recommended for API clients and server-to-server communication
+        Credentials come from the arguments or ERPNEXT_API_KEY/ERPNEXT_API_SECRET.
+        """
+        api_key = api_key or os.environ.get('ERPNEXT_API_KEY')
+        api_secret = api_secret or os.environ.get('ERPNEXT_API_SECRET')
+        if not (api_key and api_secret):
+            print("❌ Set ERPNEXT_API_KEY and ERPNEXT_API_SECRET")
+            return False
+
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.auth_method = "token"
+        self.headers['Authorization'] = f'token {api_key}:{api_secret}'
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        # Test the token
+        try:
+            response = await self.get('/api/resource/User', params={'limit_page_length': 1})
+            if response is None:
+                raise Exception("Token rejected")
+            print("✅ Token authentication successful")
+            self._log_auth_event("TOKEN_AUTH_SUCCESS", api_key[:8] + "...")
+            return True
+        except Exception as e:
+            print(f"❌ Token authentication failed: {e}")
+            self._log_auth_event("TOKEN_AUTH_FAILED", api_key[:8] + "...", str(e))
+            return False
+
+    def _log_auth_event(self, event, user, details=""):
+        """Log authentication events for security audit"""
+        timestamp = datetime.now().isoformat()
+        self.security_log.write({
+            'timestamp': timestamp,
+            'event': event,
+            'user': user,
+            'details': details,
+            'line': f"{timestamp} - {event} - User: {user} - {details}",
+        })
+
+    def _log_request(self, method, endpoint, status_code, error=""):
+        """Log API requests for audit"""
+        timestamp = datetime.now().isoformat()
+        user = getattr(self, 'current_user', 'unknown')
+        self.request_log.write({
+            'timestamp': timestamp,
+            'method': method,
+            'endpoint': endpoint,
+            'status': status_code,
+            'user': user,
+            'error': error,
+            'line': f"{timestamp} - {method} {endpoint} - {status_code} - User: {user} - {error}",
+        })
+
+    async def _make_secure_request(self, method, endpoint, **kwargs):
+        """
+        Make secure API request with proper error handling and logging
+        """
+        if self.auth_method != "session" and self.auth_method != "token":
+            raise Exception("Not authenticated. Use login_with_credentials() or authenticate_with_token()")
+
+        headers = kwargs.pop('headers', None) or {}
+        headers['X-Request-Time'] = datetime.now().isoformat()
+        if kwargs.get('params'):
+            kwargs['params'] = {k: _query_value(v) for k, v in kwargs['params'].items() if v is not None}
+
+        try:
+            async with self.session.request(method, f"{self.base_url}{endpoint}",
+                                            headers=headers, **kwargs) as response:
+                self._log_request(method, endpoint, response.status)
+
+                # Handle authentication errors
+                if response.status == 401:
+                    print("❌ Authentication failed. Token may be expired.")
+                    return None
+                elif response.status == 403:
+                    print("❌ Access forbidden. Check permissions.")
+                    return None
+                elif response.status == 429:
+                    print("❌ Rate limit exceeded. Please wait.")
+                    return None
+
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Request failed: {e}")
+            self._log_request(method, endpoint, 0, str(e))
+            raise
+
+    # Secure API methods
+    async def get(self, endpoint, params=None):
+        """Secure GET request"""
+        return await self._make_secure_request('GET', endpoint, params=params)
+
+    async def post(self, endpoint, data=None):
+        """Secure POST request"""
+        return await self._make_secure_request('POST', endpoint, json=data)
+
+    async def put(self, endpoint, data=None):
+        """Secure PUT request"""
+        return await self._make_secure_request('PUT', endpoint, json=data)
+
+    async def delete(self, endpoint):
+        """Secure DELETE request"""
+        return await self._make_secure_request('DELETE', endpoint)
+
+    async def logout(self):
+        """Logout and clear session"""
+        if self.auth_method == "session":
+            try:
+                async with self.session.post(f"{self.base_url}/api/method/logout"):
+                    pass
+                print("✅ Logged out successfully")
+            except Exception:
+                pass
+
+        # Drop cookies and the token header by discarding the pooled session
+        self.headers.pop('Authorization', None)
+        await self.close()
+        self.auth_method = None
+        print("🔒 Session cleared")
+
+    async def close(self):
+        """Close the pooled HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+async def demo_async_usage():
+    """
+    Fetch a few resources concurrently over one pooled session
+    """
+    async with AsyncERPNextClient(limit=50) as client:
+        if not await client.authenticate_with_token():
+            return
+
+        endpoints = ['/api/resource/User', '/api/resource/Company', '/api/resource/Item']
+        results = await asyncio.gather(
+            *(client.get(endpoint, params={'limit_page_length': 5}) for endpoint in endpoints),
+            return_exceptions=True
+        )
+        for endpoint, result in zip(endpoints, results):
+            if isinstance(result, Exception) or result is None:
+                print(f"   ❌ {endpoint}: {result}")
+            else:
+                print(f"   ✅ {endpoint}: {len(result.get('data', []))} records")
+
+        await client.logout()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(demo_async_usage())
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
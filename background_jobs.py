@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+ERPNext Background Jobs
+Moves heavy work off the request path: submits frappe background jobs
+(RQ on the REDIS_QUEUE Redis), polls them to completion and reports queue
+depth, worker utilization and job latency so callers can throttle on
+backlog.
+
+Job and worker details come from the RQ Job / RQ Worker DocTypes (System
+Manager only). Older frappe versions without them fall back to the
+Background Jobs page, which gives queue depth but no worker figures.
+
+Examples:
+  python3 background_jobs.py stats
+  python3 background_jobs.py stats --prometheus
+  python3 background_jobs.py submit "Sales Invoice" SINV-0001 SINV-0002 ...
+"""
+
+import os
+import sys
+import json
+import argparse
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+import requests
+
+from secure_api_client import ERPNextSecureClient
+
+BULK_ACTION_METHOD = "frappe.desk.doctype.bulk_update.bulk_update.submit_cancel_or_update_docs"
+BULK_ACTION_JOB = "frappe.desk.doctype.bulk_update.bulk_update._bulk_action"
+JOBS_PAGE_METHOD = "frappe.core.page.background_jobs.background_jobs.get_info"
+QUEUES = ("short", "default", "long")
+DONE_STATUSES = ("finished", "failed", "canceled", "stopped", "expired")
+ACTION_DOCSTATUS = {"submit": 1, "cancel": 2}
+NAME_BATCH = 100  # Names per ["name", "in", [...]] filter, as in get_many (keeps URLs short)
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def _percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'count': 0, 'p50_s': 0.0, 'p95_s': 0.0, 'max_s': 0.0}
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {'count': len(values), 'p50_s': round(pick(0.50), 3), 'p95_s': round(pick(0.95), 3),
+            'max_s': round(values[-1], 3)}
+
+class Job:
+    """
+    A submitted background job
+    status is one of queued/started/finished/failed (or expired when the
+    job record is gone); refresh() asks the server again.
+    """
+
+    def __init__(self, kind, ident, check):
+        self.kind = kind    # "rq", "bulk_action", "data_import" or "prepared_report"
+        self.id = ident
+        self.status = "queued"
+        self.error = None
+        self.submitted = time.monotonic()
+        self.finished = None
+        self._check = check
+
+    @property
+    def done(self):
+        return self.status in DONE_STATUSES
+
+    def refresh(self):
+        if not self.done:
+            self.status, self.error = self._check()
+            if self.done:
+                self.finished = time.monotonic()
+        return self.status
+
+    def __repr__(self):
+        return f"Job({self.kind}, {self.id!r}, {self.status})"
+
+class BackgroundJobs:
+    """Submit, wait for and monitor frappe background jobs through an ERPNextSecureClient"""
+
+    def __init__(self, client):
+        self.client = client
+        self._rq_doctypes = None  # Unknown until first used
+        self._jobs_hidden_warned = False
+
+    def _get(self, endpoint, params=None):
+        # Always bypass the response cache: job state is what changes
+        return self.client._make_secure_request('GET', endpoint, params=params)
+
+    # Submission
+    def enqueue(self, method, **kwargs):
+        """
+        Call a whitelisted method that enqueues a job and returns its RQ job id
+        (e.g. a custom app endpoint ending in `return frappe.enqueue(...).id`).
+        """
+        result = self.client.post(f"/api/method/{method}", kwargs)
+        message = (result or {}).get('message')
+        job_id = message.get('job_id') if isinstance(message, dict) else message
+        if not isinstance(job_id, str):
+            raise Exception(f"{method} did not return a job id: {message!r}")
+        return Job("rq", job_id, lambda: self._rq_job_status(job_id))
+
+    def bulk_action(self, doctype, names, action="submit", data=None):
+        """
+        Submit, cancel or update many documents in a frappe background job
+        frappe runs batches of fewer than 20 documents inline and queues
+        larger ones. Completion of submit/cancel is detected from docstatus;
+        updates finish when no bulk job is queued or running any more.
+        """
+        names = list(names)
+        payload = {'doctype': doctype, 'docnames': json.dumps(names), 'action': action}
+        if data is not None:
+            payload['data'] = json.dumps(data)
+        if self.client.post(f"/api/method/{BULK_ACTION_METHOD}", payload) is None:
+            raise Exception(f"Bulk {action} of {len(names)} {doctype} documents was rejected")
+
+        if action in ACTION_DOCSTATUS:
+            check = lambda: self._docstatus_status(doctype, names, ACTION_DOCSTATUS[action])
+        else:
+            check = lambda: self._named_job_status(BULK_ACTION_JOB)
+        return Job("bulk_action", f"{action} {doctype} x{len(names)}", check)
+
+    def start_data_import(self, data_import):
+        """Start a saved Data Import document; it runs on the default queue"""
+        method = "frappe.core.doctype.data_import.data_import.form_start_import"
+        if self.client.post(f"/api/method/{method}", {'data_import': data_import}) is None:
+            raise Exception(f"Could not start Data Import {data_import}")
+
+        def check():
+            doc = (self._get(f"/api/resource/Data Import/{quote(data_import)}") or {}).get('data', {})
+            status = doc.get('status')
+            if status in ("Success", "Partial Success"):
+                return "finished", None
+            if status == "Error":
+                return "failed", doc.get('template_warnings') or "Data Import failed"
+            return ("started" if status == "Importing" else "queued"), None
+        return Job("data_import", data_import, check)
+
+    def prepare_report(self, report_name, filters=None):
+        """Queue a Prepared Report (see ERPNextSecureClient.queue_prepared_report)"""
+        name = self.client.queue_prepared_report(report_name, filters)
+
+        def check():
+            doc = (self._get(f"/api/resource/Prepared Report/{quote(name)}") or {}).get('data', {})
+            status = doc.get('status')
+            if status == "Completed":
+                return "finished", None
+            if status in ("Error", "Failed"):
+                return "failed", doc.get('error_message')
+            return ("started" if status == "Started" else "queued"), None
+        return Job("prepared_report", name, check)
+
+    # Polling
+    def wait(self, jobs, poll_interval=2, timeout=3600):
+        """
+        Poll one job or a list of jobs until all are done
+        The interval backs off to 30s for long jobs. Raises TimeoutError
+        when timeout seconds pass first; returns the job(s).
+        """
+        pending = [jobs] if isinstance(jobs, Job) else list(jobs)
+        deadline = time.monotonic() + timeout
+        delay = poll_interval
+        while True:
+            for job in pending:
+                job.refresh()
+            pending = [job for job in pending if not job.done]
+            if not pending:
+                return jobs
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"{len(pending)} job(s) still running after {timeout}s: {pending[:5]}")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 30)
+
+    def _rq_job_status(self, job_id):
+        try:
+            job = (self._get(f"/api/resource/RQ Job/{quote(job_id)}") or {}).get('data')
+        except requests.exceptions.HTTPError as e:
+            # Finished jobs drop out of Redis after their result TTL
+            if e.response is not None and e.response.status_code == 404:
+                return "expired", None
+            raise
+        if not job:
+            return "expired", None
+        return job.get('status'), job.get('exc_info')
+
+    def _docstatus_status(self, doctype, names, docstatus):
+        """
+        Finished once every document has the target docstatus; failed, with
+        the names left behind, once no bulk job is queued or running
+        (frappe runs small batches inline, so those are final at once)
+        """
+        unique = list(dict.fromkeys(names))
+        done = set()
+        for i in range(0, len(unique), NAME_BATCH):
+            rows = self.client._list_all(doctype, ["name", "docstatus"], [["name", "in", unique[i:i + NAME_BATCH]]])
+            done.update(row['name'] for row in rows if row.get('docstatus') == docstatus)
+        pending = [name for name in unique if name not in done]
+        if not pending:
+            return "finished", None
+        job_status = self._named_job_status(BULK_ACTION_JOB)[0]
+        if job_status in ("queued", "started"):
+            return job_status, None
+        shown = ", ".join(pending[:20]) + (", ..." if len(pending) > 20 else "")
+        return "failed", f"{len(pending)} {doctype} documents did not reach docstatus {docstatus}: {shown}"
+
+    def _named_job_status(self, job_name):
+        active = [job for job in self.jobs() if job.get('job_name') == job_name
+                  and job.get('status') in ("queued", "started")]
+        if not active:
+            return "finished", None
+        return ("started" if any(j['status'] == "started" for j in active) else "queued"), None
+
+    # Monitoring
+    def _has_rq_doctypes(self):
+        if self._rq_doctypes is None:
+            try:
+                # None means 401/403/429: not readable by this user
+                result = self._get("/api/resource/RQ Job", params={'limit_page_length': 1})
+            except requests.exceptions.HTTPError:
+                result = None
+            self._rq_doctypes = result is not None
+            if not self._rq_doctypes:
+                print("⚠️  RQ Job DocType unavailable (needs frappe v14+ and System Manager role), "
+                      "falling back to the Background Jobs page")
+        return self._rq_doctypes
+
+    def jobs(self, status=None, queue=None, limit=500):
+        """Recent jobs as dicts with job_name, queue, status and timestamps"""
+        if not self._has_rq_doctypes():
+            result = self._get(f"/api/method/{JOBS_PAGE_METHOD}")
+            if result is None and not self._jobs_hidden_warned:
+                self._jobs_hidden_warned = True
+                print("⚠️  Background jobs are not visible to this user: queue depth reads as 0 "
+                      "and wait_for_capacity() cannot throttle")
+            rows = (result or {}).get('message') or []
+            return [r for r in rows if (not status or r['status'] == status) and (not queue or r.get('queue') == queue)]
+
+        filters = [[field, "=", value] for field, value in (("status", status), ("queue", queue)) if value]
+        result = self._get("/api/resource/RQ Job", params={
+            'fields': json.dumps(["name", "job_name", "queue", "status", "creation",
+                                  "started_at", "ended_at", "time_taken", "exc_info"]),
+            'filters': json.dumps(filters),
+            'limit_page_length': limit,
+        }) or {}
+        return result.get('data', [])
+
+    def workers(self):
+        """RQ workers with their queues, status and working-time counters ([] if unavailable)"""
+        if not self._has_rq_doctypes():
+            return []
+        result = self._get("/api/resource/RQ Worker", params={
+            'fields': json.dumps(["name", "queue", "status", "current_job_id", "successful_job_count",
+                                  "failed_job_count", "total_working_time", "birth_date"]),
+            'limit_page_length': 1000,
+        }) or {}
+        return result.get('data', [])
+
+    def stats(self):
+        """
+        Queue depth, worker utilization and job latency in one dict
+        Per queue: queued/started/failed job counts, workers, busy workers
+        and utilization (busy share now; lifetime share of time spent
+        working). Latency covers recently finished jobs: wait is enqueue to
+        start, run is start to end.
+        """
+        jobs = self.jobs()
+        workers = self.workers()
+        now = datetime.now()
+        queues = {}
+
+        def queue_stats(name):
+            return queues.setdefault(name, {'queued': 0, 'started': 0, 'failed': 0, 'workers': 0,
+                                            'busy': 0, 'utilization': None, 'lifetime_utilization': None})
+
+        for queue in QUEUES:
+            queue_stats(queue)
+        for job in jobs:
+            counts = queue_stats(job.get('queue') or "default")
+            if job.get('status') in ('queued', 'started', 'failed'):
+                counts[job['status']] += 1
+
+        lifetime = {}
+        for worker in workers:
+            born = _parse_time(worker.get('birth_date'))
+            alive = (now - born).total_seconds() if born else 0
+            for queue in str(worker.get('queue') or "default").split(","):
+                counts = queue_stats(queue.strip())
+                counts['workers'] += 1
+                if worker.get('status') == "busy":
+                    counts['busy'] += 1
+                working, total = lifetime.get(queue.strip(), (0.0, 0.0))
+                lifetime[queue.strip()] = (working + float(worker.get('total_working_time') or 0), total + alive)
+        for name, counts in queues.items():
+            if counts['workers']:
+                counts['utilization'] = round(counts['busy'] / counts['workers'], 3)
+            working, total = lifetime.get(name, (0.0, 0.0))
+            if total:
+                counts['lifetime_utilization'] = round(min(working / total, 1.0), 3)
+
+        waits, runs = [], []
+        for job in jobs:
+            created, started, ended = (_parse_time(job.get(k)) for k in ("creation", "started_at", "ended_at"))
+            if created and started:
+                waits.append(max((started - created).total_seconds(), 0))
+            if started and ended:
+                runs.append(max((ended - started).total_seconds(), 0))
+
+        return {
+            'timestamp': now.isoformat(),
+            'queues': queues,
+            'latency': {'wait': _percentiles(waits), 'run': _percentiles(runs)},
+            'worker_details': bool(workers),
+        }
+
+    def wait_for_capacity(self, queue="default", max_queued=50, poll_interval=5, timeout=None):
+        """
+        Block while more than max_queued jobs wait on a queue
+        Call before submitting more work to keep the backlog bounded.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            queued = self.stats()['queues'].get(queue, {}).get('queued', 0)
+            if queued <= max_queued:
+                return queued
+            if deadline and time.monotonic() + poll_interval > deadline:
+                raise TimeoutError(f"{queued} jobs still queued on '{queue}' after {timeout}s")
+            print(f"⏳ {queued} jobs queued on '{queue}', waiting for capacity...")
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def to_prometheus(stats, prefix="erpnext_jobs"):
+        """Render stats() in the Prometheus text exposition format"""
+        out = []
+        for metric, help_text in (('queued', 'Jobs waiting in the queue'), ('started', 'Jobs running'),
+                                  ('failed', 'Failed jobs still in the registry'), ('workers', 'RQ workers'),
+                                  ('busy', 'Busy RQ workers'), ('utilization', 'Busy share of workers')):
+            out.append(f"# HELP {prefix}_{metric} {help_text}")
+            out.append(f"# TYPE {prefix}_{metric} gauge")
+            for queue, counts in sorted(stats['queues'].items()):
+                if counts[metric] is not None:
+                    out.append(f'{prefix}_{metric}{{queue="{queue}"}} {counts[metric]}')
+        for phase, latency in stats['latency'].items():
+            out.append(f"# TYPE {prefix}_{phase}_seconds summary")
+            for q in ('p50', 'p95'):
+                out.append(f'{prefix}_{phase}_seconds{{quantile="0.{q[1:]}"}} {latency[f"{q}_s"]}')
+            out.append(f"{prefix}_{phase}_seconds_count {latency['count']}")
+        return "\n".join(out) + "\n"
+
+def print_stats(stats):
+    print(f"\n{'QUEUE':<10} {'QUEUED':>7} {'RUNNING':>8} {'FAILED':>7} {'WORKERS':>8} {'BUSY':>5} {'UTIL':>6}")
+    for queue, counts in sorted(stats['queues'].items()):
+        util = f"{counts['utilization'] * 100:.0f}%" if counts['utilization'] is not None else "-"
+        print(f"{queue:<10} {counts['queued']:>7} {counts['started']:>8} {counts['failed']:>7} "
+              f"{counts['workers']:>8} {counts['busy']:>5} {util:>6}")
+    for phase, latency in stats['latency'].items():
+        print(f"Job {phase} time: p50 {latency['p50_s']}s, p95 {latency['p95_s']}s, "
+              f"max {latency['max_s']}s over {latency['count']} jobs")
+    if not stats['worker_details']:
+        print("⚠️  Worker details unavailable (needs RQ Worker DocType and System Manager role)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit and monitor ERPNext background jobs")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    stats = subcommands.add_parser("stats", help="show queue depth, worker utilization and job latency")
+    stats.add_argument("--prometheus", action="store_true", help="print Prometheus text format")
+    stats.add_argument("--watch", type=float, help="refresh every N seconds")
+
+    submit = subcommands.add_parser("submit", help="submit documents in a background job and wait")
+    submit.add_argument("doctype")
+    submit.add_argument("names", nargs="+")
+    submit.add_argument("--action", choices=("submit", "cancel"), default="submit")
+    submit.add_argument("--max-queued", type=int, default=50, help="wait while the short queue is deeper")
+    args = parser.parse_args()
+
+    client = ERPNextSecureClient(args.url)
+    if not client.authenticate_with_token():
+        sys.exit(1)
+    jobs = BackgroundJobs(client)
+
+    try:
+        if args.command == "stats":
+            while True:
+                current = jobs.stats()
+                if args.prometheus:
+                    print(BackgroundJobs.to_prometheus(current), end="")
+                else:
+                    print_stats(current)
+                if not args.watch:
+                    break
+                time.sleep(args.watch)
+        else:
+            jobs.wait_for_capacity("short", args.max_queued)
+            job = jobs.bulk_action(args.doctype, args.names, args.action)
+            print(f"📨 Queued {job.id}")
+            jobs.wait(job)
+            elapsed = job.finished - job.submitted
+            print(f"{'✅' if job.status == 'finished' else '❌'} {job.id}: {job.status} in {elapsed:.1f}s"
+                  + (f" - {job.error}" if job.error else ""))
+            if job.status != "finished":
+                sys.exit(1)
+    finally:
+        client.logout()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
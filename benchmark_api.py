@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+ERPNext API Benchmark
+Replays a weighted list/get/create/report workload against a running stack
+(by default the local docker-compose.yml deployment) through
+ERPNextSecureClient and records throughput, latency percentiles and error
+rates as JSON so runs can be compared across configurations.
+
+Examples:
+  python3 benchmark_api.py --concurrency 16 --duration 60 --label gunicorn-4w
+  python3 benchmark_api.py --rps 40 --mix list=50,get=40,create=10
+  python3 benchmark_api.py --mix list=70,report=30 --report "Stock Balance" \
+      --report-filters '{"company": "My Company"}'
+  python3 benchmark_api.py --compare results/gunicorn-2w.json results/gunicorn-4w.json
+"""
+
+import os
+import json
+import random
+import argparse
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from secure_api_client import ERPNextSecureClient
+
+DEFAULT_MIX = "list=55,get=35,create=10"
+OPERATIONS = ("list", "get", "create", "report")
+
+def parse_mix(text):
+    """Parse "list=50,get=40,create=10" into {operation: weight}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Workload mix needs at least one operation with a positive weight")
+    return mix
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def latency_stats(samples):
+    values = sorted(samples)
+    return {
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+class Workload:
+    """
+    The operations a benchmark worker can run
+    Each operation returns normally on success and raises on failure.
+    """
+
+    def __init__(self, client, doctype, report=None, report_filters=None):
+        self.client = client
+        self.doctype = doctype
+        self.resource = f"/api/resource/{quote(doctype)}"
+        self.report = report
+        self.report_filters = report_filters or {}
+        self.names = []
+        self.created = []
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """Collect document names for the get operation"""
+        result = self.client.get(self.resource, params={'limit_page_length': 200, 'fields': '["name"]'})
+        self.names = [row['name'] for row in (result or {}).get('data', [])]
+        if not self.names:
+            print(f"⚠️  No {self.doctype} records found; 'get' operations will fail")
+
+    def run(self, operation):
+        result = getattr(self, f"op_{operation}")()
+        if result is None:
+            raise Exception("Request rejected (401/403/429)")
+        return result
+
+    def op_list(self):
+        return self.client.get(self.resource, params={'limit_page_length': 20})
+
+    def op_get(self):
+        if not self.names:
+            raise Exception(f"No {self.doctype} records to fetch")
+        return self.client.get(f"{self.resource}/{quote(random.choice(self.names))}")
+
+    def op_create(self):
+        result = self.client.post('/api/resource/ToDo', {
+            'description': f"benchmark_api.py {datetime.now().isoformat()}",
+        })
+        if result:
+            with self._lock:
+                self.created.append(result.get('data', {}).get('name'))
+        return result
+
+    def op_report(self):
+        if not self.report:
+            raise Exception("No report configured; pass --report")
+        return self.client.get('/api/method/frappe.desk.query_report.run', params={
+            'report_name': self.report,
+            'filters': json.dumps(self.report_filters),
+        })
+
+    def cleanup(self):
+        """Delete ToDo records created by the create operation"""
+        for name in self.created:
+            if name:
+                try:
+                    self.client.delete(f"/api/resource/ToDo/{quote(name)}")
+                except Exception:
+                    pass
+
+class Pacer:
+    """Spaces request starts evenly across all workers to hit a target RPS"""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            # Don't let a stalled period turn into a burst afterwards
+            slot = max(self.next_slot, now - self.interval)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def run_benchmark(workload, mix, concurrency, duration, rps=None, warmup=0, on_measure=None):
+    """
+    Drive the workload from `concurrency` threads for `duration` seconds
+    on_measure() is called when the warm-up ends and measurement starts.
+    Returns per-operation latency samples and error counts.
+    """
+    operations = list(mix)
+    weights = [mix[op] for op in operations]
+    pacer = Pacer(rps) if rps else None
+    samples = {op: [] for op in operations}
+    errors = {op: 0 for op in operations}
+    error_messages = {}
+    lock = threading.Lock()
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while True:
+            if pacer:
+                pacer.wait()
+            started = time.monotonic()
+            if started >= stop_at:
+                return
+            operation = rng.choices(operations, weights)[0]
+            failed = None
+            try:
+                workload.run(operation)
+            except Exception as e:
+                failed = str(e)[:200]
+            elapsed = time.monotonic() - started
+            if started < measure_from:
+                continue
+            with lock:
+                if failed is None:
+                    samples[operation].append(elapsed)
+                else:
+                    errors[operation] += 1
+                    error_messages[failed] = error_messages.get(failed, 0) + 1
+
+    measure_timer = None
+    if on_measure:
+        measure_timer = threading.Timer(max(measure_from - time.monotonic(), 0), on_measure)
+        measure_timer.start()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if measure_timer:
+        measure_timer.join()
+
+    return samples, errors, error_messages
+
+def summarize(samples, errors, error_messages, duration):
+    all_samples = [s for values in samples.values() for s in values]
+    total_errors = sum(errors.values())
+    total = len(all_samples) + total_errors
+    summary = {
+        'totals': {
+            'requests': total,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total, 4) if total else 0.0,
+            'throughput_rps': round(len(all_samples) / duration, 2),
+            'latency': latency_stats(all_samples),
+        },
+        'operations': {},
+        'top_errors': sorted(error_messages.items(), key=lambda item: -item[1])[:10],
+    }
+    for operation, values in samples.items():
+        count = len(values) + errors[operation]
+        summary['operations'][operation] = {
+            'requests': count,
+            'errors': errors[operation],
+            'error_rate': round(errors[operation] / count, 4) if count else 0.0,
+            'throughput_rps': round(len(values) / duration, 2),
+            'latency': latency_stats(values),
+        }
+    return summary
+
+def print_summary(result):
+    totals = result['totals']
+    print("\n" + "=" * 72)
+    print(f"BENCHMARK RESULTS: {result['label']}")
+    print("=" * 72)
+    print(f"{'OPERATION':<10} {'REQS':>8} {'RPS':>8} {'ERR%':>7} {'P50ms':>9} {'P95ms':>9} {'P99ms':>9}")
+    rows = list(result['operations'].items()) + [('TOTAL', totals)]
+    for name, stats in rows:
+        latency = stats['latency']
+        print(f"{name:<10} {stats['requests']:>8} {stats['throughput_rps']:>8.2f} "
+              f"{stats['error_rate'] * 100:>6.2f}% {latency['p50_ms']:>9.1f} "
+              f"{latency['p95_ms']:>9.1f} {latency['p99_ms']:>9.1f}")
+    if result['top_errors']:
+        print("\nTop errors:")
+        for message, count in result['top_errors']:
+            print(f"   {count:>6} × {message}")
+    print("=" * 72)
+
+def compare(paths):
+    """Print the headline numbers of several result files side by side"""
+    print(f"{'LABEL':<24} {'CONC':>5} {'RPS':>9} {'ERR%':>7} {'P50ms':>9} {'P95ms':>9} {'P99ms':>9}")
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        totals = result['totals']
+        latency = totals['latency']
+        print(f"{result['label'][:24]:<24} {result['config']['concurrency']:>5} "
+              f"{totals['throughput_rps']:>9.2f} {totals['error_rate'] * 100:>6.2f}% "
+              f"{latency['p50_ms']:>9.1f} {latency['p95_ms']:>9.1f} {latency['p99_ms']:>9.1f}")
+
+def build_client(args):
+    """Authenticated client with a connection pool sized for the worker count"""
+    # No client-side retries or rate limiting: measure the server as-is
+    client = ERPNextSecureClient(args.url, max_retries=0, pool_maxsize=args.concurrency)
+
+    if args.user:
+        password = os.environ.get('ERPNEXT_PASSWORD')
+        ok = client.login_with_credentials(args.user, password)
+    else:
+        ok = client.authenticate_with_token()
+    return client if ok else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark an ERPNext deployment through ERPNextSecureClient")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    parser.add_argument("--user", help="login with a session for this user (password from ERPNEXT_PASSWORD); "
+                                       "otherwise ERPNEXT_API_KEY/ERPNEXT_API_SECRET are used")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--doctype", default="User", help="DocType used by list/get operations")
+    parser.add_argument("--report", help="report name for the report operation")
+    parser.add_argument("--report-filters", default="{}", help="JSON filters for the report operation")
+    parser.add_argument("--concurrency", type=int, default=8, help="worker threads")
+    parser.add_argument("--rps", type=float, help="target request rate across all workers (default: unpaced)")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--label", default=None, help="name for this run, e.g. the config under test")
+    parser.add_argument("--output", default=None, help="results file (default results/<label>.json)")
+    parser.add_argument("--no-cleanup", action="store_true", help="keep ToDo records created by the run")
+    parser.add_argument("--compare", nargs="+", metavar="RESULT", help="compare result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    label = args.label or datetime.now().strftime("run-%Y%m%d-%H%M%S")
+
+    client = build_client(args)
+    if not client:
+        print("❌ Authentication failed")
+        return
+
+    workload = Workload(client, args.doctype, args.report, json.loads(args.report_filters))
+    if mix.get("get"):
+        workload.prepare()
+
+    pace = f"{args.rps} rps" if args.rps else "unpaced"
+    print(f"\n🏁 Running {label}: {args.concurrency} workers, {pace}, "
+          f"{args.warmup:g}s warmup + {args.duration:g}s, mix {args.mix}")
+    started = datetime.now().isoformat()
+    # Client metrics cover the measured window only, like the totals
+    samples, errors, error_messages = run_benchmark(
+        workload, mix, args.concurrency, args.duration, args.rps, args.warmup,
+        on_measure=client.metrics.reset,
+    )
+
+    result = {
+        'label': label,
+        'started': started,
+        'config': {
+            'url': args.url,
+            'mix': mix,
+            'doctype': args.doctype,
+            'report': args.report,
+            'concurrency': args.concurrency,
+            'rps': args.rps,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+        },
+        **summarize(samples, errors, error_messages, args.duration),
+        'client_metrics': client.metrics.summary(),
+    }
+    print_summary(result)
+
+    output = args.output or os.path.join("results", f"{label}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"✓ Results saved to: {output}")
+
+    if not args.no_cleanup:
+        workload.cleanup()
+    client.logout()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
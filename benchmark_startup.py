@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+CLI Startup Benchmark
+Times cold starts of the command line entry points in fresh interpreters
+(no network involved) and checks the light ones (--help and argument
+parsing of erpnext_cli.py) against a budget over bare interpreter
+startup. Exits non-zero when a budget is exceeded, so it can run in CI.
+
+Examples:
+  python3 benchmark_startup.py
+  python3 benchmark_startup.py --runs 20 --max-overhead-ms 40
+  python3 benchmark_startup.py --importtime "cli ping --help"
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(HERE, "erpnext_cli.py")
+
+# name -> (command, held to the overhead budget)
+COMMANDS = {
+    "python": ([sys.executable, "-c", "pass"], False),
+    "cli --help": ([sys.executable, CLI, "--help"], True),
+    "cli ping --help": ([sys.executable, CLI, "ping", "--help"], True),
+    "cli docs --help": ([sys.executable, CLI, "docs", "--help"], False),
+    "cli export --help": ([sys.executable, CLI, "export", "--help"], False),
+    "import secure_api_client": ([sys.executable, "-c", "import secure_api_client"], False),
+}
+
+def time_command(command, runs):
+    """Wall-clock seconds of each run, after one unmeasured warm-up run"""
+    timings = []
+    for attempt in range(runs + 1):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        if attempt:
+            timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+def top_imports(command, limit=15):
+    """Slowest imports of a command by cumulative time, from -X importtime"""
+    result = subprocess.run([command[0], "-X", "importtime", *command[1:]], cwd=HERE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            imports.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(imports, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the CLI entry points")
+    parser.add_argument("--runs", type=int, default=10, help="measured runs per command")
+    parser.add_argument("--max-overhead-ms", type=float, default=60,
+                        help="budget for light commands over bare interpreter startup (median)")
+    parser.add_argument("--importtime", metavar="NAME", choices=sorted(COMMANDS),
+                        help="list the slowest imports of one command and exit")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.importtime:
+        print(f"\n🐢 Slowest imports for '{args.importtime}' (cumulative ms)")
+        for ms, name in top_imports(COMMANDS[args.importtime][0]):
+            print(f"   {ms:>8.1f}  {name}")
+        return
+
+    results = {}
+    print(f"\n⏱️  Cold start, {args.runs} runs each")
+    print(f"{'COMMAND':<26} {'MIN ms':>8} {'MEDIAN ms':>10} {'MAX ms':>8}")
+    for name, (command, _) in COMMANDS.items():
+        timings = time_command(command, args.runs)
+        results[name] = {
+            'min_ms': round(timings[0] * 1000, 1),
+            'median_ms': round(timings[len(timings) // 2] * 1000, 1),
+            'max_ms': round(timings[-1] * 1000, 1),
+        }
+        stats = results[name]
+        print(f"{name:<26} {stats['min_ms']:>8.1f} {stats['median_ms']:>10.1f} {stats['max_ms']:>8.1f}")
+
+    baseline = results["python"]['median_ms']
+    failures = []
+    print(f"\n🎯 Budget: light commands within {args.max_overhead_ms:g} ms of bare startup ({baseline:g} ms)")
+    for name, (_, light) in COMMANDS.items():
+        if not light:
+            continue
+        overhead = round(results[name]['median_ms'] - baseline, 1)
+        ok = overhead <= args.max_overhead_ms
+        print(f"   {'✅' if ok else '❌'} {name}: +{overhead} ms")
+        if not ok:
+            failures.append(name)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({'started': datetime.now().isoformat(), 'python': sys.version.split()[0],
+                       'runs': args.runs, 'max_overhead_ms': args.max_overhead_ms,
+                       'commands': results, 'failures': failures}, f, indent=2)
+        print(f"✓ Results saved to: {args.output}")
+
+    if failures:
+        print(f"\n❌ Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+ERPNext Command Line
+Non-interactive entry point for cron jobs and containers:
+  docs    regenerate API_ENDPOINTS.md (options of generate_api_docs.py)
+  export  export a DocType to chunk files (options of export_api_data.py export)
+  ping    check that the site answers and the credentials work
+
+Nothing prompts. Every subcommand uses ERPNEXT_API_KEY/ERPNEXT_API_SECRET
+when set (export requires them); otherwise ping logs in as --user and docs
+as ERPNEXT_USER, with ERPNEXT_PASSWORD. Only the standard library is loaded
+until a subcommand runs, so --help and usage errors return at interpreter
+speed (see benchmark_startup.py). Exits 0 on success, 1 on failure, 2 on
+usage errors.
+
+Examples:
+  python3 erpnext_cli.py ping
+  python3 erpnext_cli.py --url https://erp.example.com ping --user Administrator
+  python3 erpnext_cli.py docs --output API_ENDPOINTS.md
+  python3 erpnext_cli.py export "GL Entry" --format csv
+"""
+
+import os
+import sys
+import argparse
+import time
+
+def run_docs(args):
+    import generate_api_docs
+    generate_api_docs.main(args.args)
+
+def run_export(args):
+    import export_api_data
+    export_api_data.main(["--url", args.url, "export", *args.args])
+
+def run_ping(args):
+    from secure_api_client import ERPNextSecureClient
+
+    client = ERPNextSecureClient(args.url, max_retries=0, read_timeout=args.timeout, interactive=False)
+    started = time.perf_counter()
+    if args.user:
+        ok = client.login_with_credentials(args.user, os.environ.get('ERPNEXT_PASSWORD'))
+    else:
+        ok = client.authenticate_with_token()
+    ok = ok and client.ping()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if client.auth_method:
+        client.logout()
+
+    print(f"{'✅' if ok else '❌'} {args.url} {'is up' if ok else 'ping failed'} ({elapsed_ms:.0f} ms)")
+    if not ok:
+        sys.exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Non-interactive ERPNext tools for scheduled jobs")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    # docs and export hand their options to the underlying script unparsed
+    docs = subcommands.add_parser("docs", add_help=False, help="generate API_ENDPOINTS.md (see docs --help)")
+    docs.set_defaults(handler=run_docs, forwards=True)
+
+    export = subcommands.add_parser("export", add_help=False, help="export a DocType (see export --help)")
+    export.set_defaults(handler=run_export, forwards=True)
+
+    ping = subcommands.add_parser("ping", help="check connectivity and credentials")
+    ping.add_argument("--user", help="log in with a session for this user (password from ERPNEXT_PASSWORD); "
+                                     "otherwise ERPNEXT_API_KEY/ERPNEXT_API_SECRET are used")
+    ping.add_argument("--timeout", type=float, default=10, help="read timeout in seconds")
+    ping.set_defaults(handler=run_ping)
+
+    args, forwarded = parser.parse_known_args(argv)
+    if forwarded and not getattr(args, 'forwards', False):
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)}")
+    args.args = forwarded
+    # generate_api_docs reads its server from the environment
+    os.environ['ERPNEXT_URL'] = args.url
+    args.handler(args)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+ERPNext DocType Export
+Streams a DocType page by page into chunked columnar files: Parquet or Arrow
+IPC when pyarrow is installed, CSV otherwise. Memory is bounded by the chunk
+size, and a checkpoint (last modified/name) after every chunk lets an
+interrupted export continue where it stopped. --refresh on a finished export
+writes rows modified since then to delta-NNN/ subdirectories; a row there
+supersedes the row of the same name in the base chunks and earlier deltas.
+
+Examples:
+  python3 export_api_data.py export "GL Entry" --output exports/gl_entry
+  python3 export_api_data.py export "Sales Invoice" --fields name,customer,grand_total,modified --format csv
+  python3 export_api_data.py export "GL Entry" --output exports/gl_entry --refresh
+  python3 export_api_data.py status exports/gl_entry
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from datetime import datetime
+
+from secure_api_client import META_CACHE_FILE, ERPNextSecureClient, MetadataCache
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional dependency, CSV is used without it
+    pyarrow = None
+
+CHECKPOINT_FILE = "_checkpoint.json"
+FORMATS = ("parquet", "arrow", "csv")
+
+def default_format():
+    return "parquet" if pyarrow is not None else "csv"
+
+def load_checkpoint(output_dir):
+    """Return the checkpoint dict of an export directory, or None"""
+    try:
+        with open(os.path.join(output_dir, CHECKPOINT_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_checkpoint(output_dir, checkpoint):
+    """Write the checkpoint atomically"""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def _arrow_type(values):
+    """Column type used for every chunk: numbers widen to float64, the rest are strings"""
+    kinds = {type(v) for v in values if v is not None}
+    if kinds == {bool}:
+        return pyarrow.bool_()
+    if kinds and kinds <= {int, float}:
+        return pyarrow.float64()
+    return pyarrow.string()
+
+def _arrow_value(value, arrow_type):
+    if value is None:
+        return None
+    if arrow_type == pyarrow.float64():
+        return float(value) if isinstance(value, (int, float)) else None
+    if arrow_type == pyarrow.bool_():
+        return bool(value)
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+def write_chunk(output_dir, index, columns, rows, fmt, schema=None):
+    """
+    Write one chunk as part-NNNNN.<fmt> via a temp file and rename
+    Returns the Arrow schema used so later chunks keep the same column types.
+    """
+    path = os.path.join(output_dir, f"part-{index:05d}.{fmt}")
+    tmp_path = f"{path}.tmp"
+
+    if fmt == "csv":
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    else:
+        if schema is None:
+            schema = pyarrow.schema([
+                (column, _arrow_type([row[i] for row in rows])) for i, column in enumerate(columns)
+            ])
+        arrays = [
+            pyarrow.array([_arrow_value(row[i], field.type) for row in rows], type=field.type)
+            for i, field in enumerate(schema)
+        ]
+        table = pyarrow.Table.from_arrays(arrays, schema=schema)
+        if fmt == "parquet":
+            pyarrow.parquet.write_table(table, tmp_path, compression="zstd")
+        else:
+            with pyarrow.ipc.new_file(tmp_path, schema) as writer:
+                writer.write_table(table)
+
+    os.replace(tmp_path, path)
+    return schema
+
+def _arrow_schema_from_checkpoint(checkpoint):
+    if pyarrow is None or not checkpoint.get("schema"):
+        return None
+    types = {"bool": pyarrow.bool_(), "float64": pyarrow.float64(), "string": pyarrow.string()}
+    return pyarrow.schema([(name, types[kind]) for name, kind in checkpoint["schema"]])
+
+def export_doctype(client, doctype, output_dir, fields=None, filters=None, fmt=None,
+                   chunk_rows=50000, page_size=1000, resume=True, refresh=False):
+    """
+    Export a DocType to chunk files in output_dir
+    Rows are read in (modified, name) order and the watermark is saved after
+    every chunk, so a rerun with resume=True skips what was already written.
+    A finished export is left alone unless refresh=True, which writes the
+    rows modified since into the next delta-NNN directory.
+    Returns the final checkpoint dict.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (choose from {', '.join(FORMATS)})")
+    if fmt != "csv" and pyarrow is None:
+        raise ImportError(f"{fmt} export requires pyarrow: pip install pyarrow (or use --format csv)")
+
+    # Keyset pagination needs name and modified in every row
+    if fields:
+        unknown = client.get_meta(doctype).unknown_fields(fields)
+        if unknown:
+            raise ValueError(f"{doctype} has no field(s) {', '.join(unknown)}")
+        fields = list(fields) + [f for f in ("name", "modified") if f not in fields]
+
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = load_checkpoint(output_dir) if resume else None
+    if checkpoint and (checkpoint["doctype"] != doctype or checkpoint["format"] != fmt
+                       or checkpoint["fields"] != fields or checkpoint["filters"] != filters):
+        raise ValueError(f"{output_dir} holds a different export; use another directory or resume=False")
+    if checkpoint and checkpoint.get("completed"):
+        if not refresh:
+            print(f"   ✓ {output_dir} is already complete (pass --refresh to export later changes)")
+            return checkpoint
+        # Rows modified since the finished run go to their own delta directory
+        checkpoint["delta"] = checkpoint.get("delta", 0) + 1
+        checkpoint["completed"] = False
+    if not checkpoint:
+        checkpoint = {
+            "doctype": doctype,
+            "fields": fields,
+            "filters": filters,
+            "format": fmt,
+            "columns": fields,
+            "schema": None,
+            "modified": None,  # Watermark: last exported modified timestamp
+            "name": None,      # ...and the name of that row
+            "rows": 0,
+            "chunks": 0,
+            "delta": 0,        # 0 while writing the base export, then the current delta-NNN
+            "started": datetime.now().isoformat(),
+            "completed": False,
+        }
+
+    schema = _arrow_schema_from_checkpoint(checkpoint)
+    columns = checkpoint["columns"]
+    chunk_dir = output_dir
+    if checkpoint.get("delta"):
+        chunk_dir = os.path.join(output_dir, f"delta-{checkpoint['delta']:03d}")
+        os.makedirs(chunk_dir, exist_ok=True)
+    buffer = []
+    state = {k: checkpoint[k] for k in ("modified", "name")}
+
+    def flush():
+        nonlocal schema
+        if not buffer:
+            return
+        schema = write_chunk(chunk_dir, checkpoint["chunks"], columns, buffer, fmt, schema)
+        checkpoint.update(state)
+        checkpoint["rows"] += len(buffer)
+        checkpoint["chunks"] += 1
+        checkpoint["columns"] = columns
+        if schema is not None:
+            checkpoint["schema"] = [(f.name, str(f.type).replace("double", "float64")) for f in schema]
+        save_checkpoint(output_dir, checkpoint)
+        print(f"   💾 chunk {checkpoint['chunks']:>5}  {checkpoint['rows']:>10} rows  up to {state['modified']}")
+        buffer.clear()
+
+    rows = client.iter_since(doctype, fields, filters, since=state["modified"], after_name=state["name"],
+                             page_size=page_size)
+    for row, modified, name in rows:
+        if isinstance(row, dict):
+            if columns is None:
+                columns = list(row)
+            row = [row.get(c) for c in columns]
+        state.update(modified=modified, name=name)
+        buffer.append(row)
+        if len(buffer) >= chunk_rows:
+            flush()
+
+    flush()
+    checkpoint.update(state)
+    checkpoint["completed"] = True
+    checkpoint["finished"] = datetime.now().isoformat()
+    save_checkpoint(output_dir, checkpoint)
+    return checkpoint
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export ERPNext DocTypes to chunked Parquet/Arrow/CSV files")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    export = subcommands.add_parser("export", help="export (or resume exporting) a DocType")
+    export.add_argument("doctype")
+    export.add_argument("--output", help="export directory (default exports/<doctype>)")
+    export.add_argument("--fields", help="comma-separated fields (default: all)")
+    export.add_argument("--filters", help="JSON frappe filters, e.g. '[[\"company\",\"=\",\"ACME\"]]'")
+    export.add_argument("--format", choices=FORMATS, default=None,
+                        help=f"output format (default {default_format()})")
+    export.add_argument("--chunk-rows", type=int, default=50000, help="rows per output file")
+    export.add_argument("--page-size", type=int, default=1000, help="rows per API request")
+    export.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    export.add_argument("--refresh", action="store_true",
+                        help="on a finished export, write rows changed since to a new delta-NNN directory")
+
+    status = subcommands.add_parser("status", help="show the checkpoint of an export directory")
+    status.add_argument("output")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        checkpoint = load_checkpoint(args.output)
+        if not checkpoint:
+            print(f"No checkpoint in {args.output}")
+            return
+        state = "complete" if checkpoint.get("completed") else "incomplete"
+        deltas = f", {checkpoint['delta']} delta(s)" if checkpoint.get("delta") else ""
+        print(f"{checkpoint['doctype']}: {checkpoint['rows']} rows in {checkpoint['chunks']} "
+              f"{checkpoint['format']} chunks{deltas} ({state}), "
+              f"watermark {checkpoint['modified']} / {checkpoint['name']}")
+        return
+
+    output = args.output or os.path.join("exports", args.doctype.lower().replace(" ", "_"))
+    client = ERPNextSecureClient(args.url, metadata=MetadataCache(META_CACHE_FILE))
+    if not client.authenticate_with_token():
+        sys.exit(1)
+
+    print(f"\n📦 Exporting {args.doctype} to {output}")
+    checkpoint = export_doctype(
+        client, args.doctype, output,
+        fields=args.fields.split(",") if args.fields else None,
+        filters=json.loads(args.filters) if args.filters else None,
+        fmt=args.format,
+        chunk_rows=args.chunk_rows,
+        page_size=args.page_size,
+        resume=not args.restart,
+        refresh=args.refresh,
+    )
+    print(f"✓ Exported {checkpoint['rows']} rows in {checkpoint['chunks']} chunks")
+    client.logout()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Interrupted - rerun the same command to resume")
@@ -1,22 +1,44 @@
 #!/usr/bin/env python3
 
-import requests
+import os
+import sys
+import argparse
+import hashlib
+import sqlite3
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import urllib.parse
 
 # Configuration
-API_URL = "http://localhost:8080"
-USERNAME = "Administrator"
-PASSWORD = "LocalDev123!"
+API_URL = os.environ.get("ERPNEXT_URL", "http://localhost:8080")
+# Token auth when ERPNEXT_API_KEY/ERPNEXT_API_SECRET are set, else a session login
+# (the defaults are the local docker-compose stack's)
+API_KEY = os.environ.get("ERPNEXT_API_KEY")
+API_SECRET = os.environ.get("ERPNEXT_API_SECRET")
+USERNAME = os.environ.get("ERPNEXT_USER", "Administrator")
+PASSWORD = os.environ.get("ERPNEXT_PASSWORD", "LocalDev123!")
+SAMPLE_CONCURRENCY = 8  # Parallel sample fetches (1 = serial)
+CACHE_FILE = ".api_docs_cache.db"  # DocType metadata, samples and sections from earlier runs
+DOCTYPE_FIELDS = ["name", "module", "issingle", "is_submittable", "istable", "modified"]
 
-def login():
+def login(pool_size=SAMPLE_CONCURRENCY):
     """Login and return session"""
+    import requests  # Deferred so --help and argument errors return without loading it
+    
     session = requests.Session()
-    response = session.post(
-        f"{API_URL}/api/method/login",
-        json={"usr": USERNAME, "pwd": PASSWORD}
-    )
+    # Size the connection pool so concurrent sampling reuses connections
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if API_KEY and API_SECRET:
+        session.headers["Authorization"] = f"token {API_KEY}:{API_SECRET}"
+        response = session.get(f"{API_URL}/api/method/frappe.auth.get_logged_user")
+    else:
+        response = session.post(
+            f"{API_URL}/api/method/login",
+            json={"usr": USERNAME, "pwd": PASSWORD}
+        )
     if response.status_code == 200:
         print("✓ Logged in successfully")
         return session
@@ -24,21 +46,37 @@ def login():
         print("✗ Login failed")
         return None
 
-def get_all_doctypes(session):
-    """Fetch all DocTypes"""
-    response = session.get(
-        f"{API_URL}/api/resource/DocType",
-        params={
-            "limit_page_length": 1000,
-            "fields": json.dumps(["name", "module", "issingle", "is_submittable", "istable"])
-        }
-    )
-    if response.status_code == 200:
-        return response.json().get("data", [])
-    return []
+def get_all_doctypes(session, page_size=500, fields=DOCTYPE_FIELDS, modified_since=None):
+    """
+    Fetch all DocTypes (optionally only those modified since a timestamp), following pagination
+    Raises RuntimeError if a page fails: a partial list would be cached and
+    rendered as if the missing DocTypes had been deleted.
+    """
+    doctypes = []
+    start = 0
+    params = {
+        "limit_page_length": page_size,
+        "order_by": "name asc",
+        "fields": json.dumps(fields)
+    }
+    if modified_since:
+        params["filters"] = json.dumps([["modified", ">=", modified_since]])
+    while True:
+        response = session.get(
+            f"{API_URL}/api/resource/DocType",
+            params={**params, "limit_start": start}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"DocType listing failed at offset {start} (HTTP {response.status_code})")
+        page = response.json().get("data", [])
+        doctypes.extend(page)
+        if len(page) < page_size:
+            break
+        start += page_size
+    return doctypes
 
 def get_sample_records(session, doctype, limit=3):
-    """Get sample record names for a DocType"""
+    """Get sample record names for a DocType (None if the request failed)"""
     try:
         # URL encode the DocType name
         doctype_encoded = urllib.parse.quote(doctype)
@@ -54,15 +92,240 @@ def get_sample_records(session, doctype, limit=3):
             return [record.get("name", "") for record in data]
     except:
         pass
-    return []
+    return None
+
+def fetch_all_samples(session, doctypes, concurrency=SAMPLE_CONCURRENCY, on_result=None):
+    """
+    Fetch sample names for all listable DocTypes, keyed by DocType name
+    on_result(doctype, samples) is called from the calling thread as each
+    successful fetch completes, so results can be persisted immediately.
+    """
+    names = [
+        d.get("name", "") for d in doctypes
+        if not d.get("issingle") and not d.get("istable")
+    ]
+    results = {}
+    
+    def collect(name, samples):
+        results[name] = samples or []
+        if samples is not None and on_result:
+            on_result(name, samples)
+    
+    if concurrency <= 1:
+        for name in names:
+            collect(name, get_sample_records(session, name))
+        return results
+    
+    # Bounded pool over the shared session; results are keyed by name so the
+    # rendered output does not depend on completion order
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(get_sample_records, session, name): name for name in names}
+        for done, future in enumerate(as_completed(futures), 1):
+            collect(futures[future], future.result())
+            if done % 50 == 0:
+                print(f"  Sampled {done}/{len(names)} DocTypes...")
+    return results
+
+class DocsCache:
+    """
+    On-disk cache for the documentation generator (SQLite)
+    Holds the DocType list, sample names and rendered module sections, keyed
+    by site and each DocType's `modified`. Samples are committed as they
+    arrive, so an interrupted run resumes where it stopped; entries for
+    changed or deleted DocTypes are evicted on the next run.
+    """
+    
+    def __init__(self, path=CACHE_FILE, site=API_URL):
+        self.site = site
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS doctypes (
+                site TEXT, name TEXT, modified TEXT, info TEXT,
+                PRIMARY KEY (site, name)
+            );
+            CREATE TABLE IF NOT EXISTS samples (
+                site TEXT, doctype TEXT, modified TEXT, names TEXT, fetched_at TEXT,
+                PRIMARY KEY (site, doctype)
+            );
+            CREATE TABLE IF NOT EXISTS sections (
+                site TEXT, module TEXT, fingerprint TEXT, lines TEXT,
+                PRIMARY KEY (site, module)
+            );
+        """)
+    
+    def get_doctypes(self):
+        rows = self.db.execute("SELECT info FROM doctypes WHERE site = ?", (self.site,))
+        return [json.loads(info) for (info,) in rows]
+    
+    def save_doctypes(self, doctypes):
+        with self.db:
+            self.db.execute("DELETE FROM doctypes WHERE site = ?", (self.site,))
+            self.db.executemany(
+                "INSERT INTO doctypes (site, name, modified, info) VALUES (?, ?, ?, ?)",
+                [(self.site, d["name"], d.get("modified"), json.dumps(d)) for d in doctypes]
+            )
+    
+    def get_samples(self, doctypes):
+        """Cached samples for DocTypes whose `modified` still matches"""
+        modified = {d["name"]: d.get("modified") for d in doctypes}
+        rows = self.db.execute("SELECT doctype, modified, names FROM samples WHERE site = ?", (self.site,))
+        return {
+            doctype: json.loads(names)
+            for doctype, cached_modified, names in rows
+            if doctype in modified and modified[doctype] == cached_modified
+        }
+    
+    def put_sample(self, doctype, modified, names):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO samples (site, doctype, modified, names, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (self.site, doctype, modified, json.dumps(names), datetime.now().isoformat())
+            )
+    
+    def evict(self, doctypes):
+        """Drop samples and sections that no longer match the current DocTypes"""
+        modified = {d["name"]: d.get("modified") for d in doctypes}
+        modules = {d.get("module", "Unknown") for d in doctypes}
+        rows = self.db.execute("SELECT doctype, modified FROM samples WHERE site = ?", (self.site,)).fetchall()
+        stale = [(self.site, doctype) for doctype, cached in rows if modified.get(doctype, object()) != cached]
+        sections = self.db.execute("SELECT module FROM sections WHERE site = ?", (self.site,)).fetchall()
+        with self.db:
+            self.db.executemany("DELETE FROM samples WHERE site = ? AND doctype = ?", stale)
+            self.db.executemany("DELETE FROM sections WHERE site = ? AND module = ?",
+                                [(self.site, m) for (m,) in sections if m not in modules])
+        return len(stale)
+    
+    def get_section(self, module, fingerprint):
+        row = self.db.execute(
+            "SELECT lines FROM sections WHERE site = ? AND module = ? AND fingerprint = ?",
+            (self.site, module, fingerprint)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put_section(self, module, fingerprint, lines):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sections (site, module, fingerprint, lines) VALUES (?, ?, ?, ?)",
+                (self.site, module, fingerprint, json.dumps(lines))
+            )
+    
+    def clear(self):
+        with self.db:
+            for table in ("doctypes", "samples", "sections"):
+                self.db.execute(f"DELETE FROM {table} WHERE site = ?", (self.site,))
+    
+    def close(self):
+        self.db.close()
+
+def fetch_doctypes_incremental(session, previous):
+    """
+    Bring a cached DocType list up to date
+    Only DocTypes modified since the newest cached one are fetched in full;
+    a name-only listing detects deletions. Either listing failing raises,
+    so the cache is never updated from a partial view.
+    """
+    known = {d["name"]: d for d in previous}
+    since = max((d.get("modified") or "" for d in known.values()), default="")
+    
+    changed = get_all_doctypes(session, modified_since=since or None)
+    current_names = {d["name"] for d in get_all_doctypes(session, fields=["name"])}
+    
+    merged = {name: info for name, info in known.items() if name in current_names}
+    for info in changed:
+        merged[info["name"]] = info
+    return list(merged.values())
+
+def module_fingerprint(module_doctypes, all_samples):
+    """Hash of everything a module section is rendered from"""
+    payload = [
+        (d.get("name"), d.get("modified"), d.get("issingle"), d.get("istable"),
+         d.get("is_submittable"), all_samples.get(d.get("name")))
+        for d in sorted(module_doctypes, key=lambda x: x.get("name", ""))
+    ]
+    return hashlib.sha1(json.dumps(payload, default=str).encode()).hexdigest()
+
+def render_module_section(module, module_doctypes, all_samples):
+    """Render the markdown lines for one module's DocType table"""
+    lines = []
+    lines.append(f"### {module}")
+    lines.append("")
+    lines.append("| DocType | Type | Sample Names | API Endpoints |")
+    lines.append("|---------|------|--------------|---------------|")
+    
+    for doctype_info in sorted(module_doctypes, key=lambda x: x.get("name", "")):
+        doctype = doctype_info.get("name", "")
+        issingle = doctype_info.get("issingle", 0)
+        istable = doctype_info.get("istable", 0)
+        is_submittable = doctype_info.get("is_submittable", 0)
+        
+        # Determine type
+        if issingle:
+            dtype = "Single"
+        elif istable:
+            dtype = "Child Table"
+        elif is_submittable:
+            dtype = "Submittable"
+        else:
+            dtype = "Standard"
+        
+        # Get sample records
+        if issingle:
+            samples = [doctype]
+        elif istable:
+            samples = ["(Child of parent doc)"]
+        else:
+            samples = all_samples.get(doctype, [])
+            if not samples:
+                samples = ["(No records)"]
+        
+        # Format samples
+        sample_str = ", ".join(str(s) for s in samples[:2])
+        if len(sample_str) > 40:
+            sample_str = sample_str[:37] + "..."
+        
+        # Format endpoints
+        doctype_url = urllib.parse.quote(doctype)
+        if issingle:
+            endpoints = f"`GET /api/resource/{doctype_url}/{doctype_url}`"
+        else:
+            endpoints = f"`/api/resource/{doctype_url}`"
+        
+        lines.append(f"| {doctype} | {dtype} | {sample_str} | {endpoints} |")
+    
+    lines.append("")
+    return lines
 
-def generate_documentation(session):
-    """Generate comprehensive API documentation"""
+def generate_documentation(session, concurrency=SAMPLE_CONCURRENCY, cache=None):
+    """
+    Generate comprehensive API documentation
+    With a DocsCache, only DocTypes modified since the cached list are
+    fetched, cached samples are reused, and only module sections whose
+    inputs changed are re-rendered.
+    """
     
-    print("Fetching all DocTypes...")
-    doctypes = get_all_doctypes(session)
+    previous = cache.get_doctypes() if cache else []
+    if previous:
+        print("Fetching DocTypes modified since last run...")
+        doctypes = fetch_doctypes_incremental(session, previous)
+    else:
+        print("Fetching all DocTypes...")
+        doctypes = get_all_doctypes(session)
     print(f"Found {len(doctypes)} DocTypes")
     
+    all_samples = {}
+    to_sample = doctypes
+    on_result = None
+    if cache:
+        evicted = cache.evict(doctypes)
+        all_samples = cache.get_samples(doctypes)
+        to_sample = [d for d in doctypes if d["name"] not in all_samples]
+        modified = {d["name"]: d.get("modified") for d in doctypes}
+        on_result = lambda name, samples: cache.put_sample(name, modified[name], samples)
+        print(f"Cache: {len(all_samples)} samples reused, {evicted} stale entries evicted")
+    
+    print(f"Fetching sample records ({concurrency} concurrent)...")
+    all_samples.update(fetch_all_samples(session, to_sample, concurrency, on_result))
+    
     # Group by module
     modules = {}
     for doctype in doctypes:
@@ -121,61 +384,17 @@ def generate_documentation(session):
     
     total_processed = 0
     for module in sorted_modules:
-        print(f"\nProcessing module: {module}")
-        doc.append(f"### {module}")
-        doc.append("")
-        doc.append("| DocType | Type | Sample Names | API Endpoints |")
-        doc.append("|---------|------|--------------|---------------|")
-        
-        module_doctypes = sorted(modules[module], key=lambda x: x.get("name", ""))
-        
-        for doctype_info in module_doctypes:
-            doctype = doctype_info.get("name", "")
-            issingle = doctype_info.get("issingle", 0)
-            istable = doctype_info.get("istable", 0)
-            is_submittable = doctype_info.get("is_submittable", 0)
-            
-            # Determine type
-            if issingle:
-                dtype = "Single"
-            elif istable:
-                dtype = "Child Table"
-            elif is_submittable:
-                dtype = "Submittable"
-            else:
-                dtype = "Standard"
-            
-            # Get sample records
-            if issingle:
-                samples = [doctype]
-            elif istable:
-                samples = ["(Child of parent doc)"]
-            else:
-                samples = get_sample_records(session, doctype)
-                if not samples:
-                    samples = ["(No records)"]
-            
-            # Format samples
-            sample_str = ", ".join(str(s) for s in samples[:2])
-            if len(sample_str) > 40:
-                sample_str = sample_str[:37] + "..."
-            
-            # Format endpoints
-            doctype_url = urllib.parse.quote(doctype)
-            if issingle:
-                endpoints = f"`GET /api/resource/{doctype_url}/{doctype_url}`"
-            else:
-                endpoints = f"`/api/resource/{doctype_url}`"
-            
-            doc.append(f"| {doctype} | {dtype} | {sample_str} | {endpoints} |")
-            
-            total_processed += 1
-            if total_processed % 10 == 0:
-                print(f"  Processed {total_processed} DocTypes...")
-        
-        doc.append("")
+        fingerprint = module_fingerprint(modules[module], all_samples)
+        section = cache.get_section(module, fingerprint) if cache else None
+        if section is None:
+            print(f"\nProcessing module: {module}")
+            section = render_module_section(module, modules[module], all_samples)
+            total_processed += len(modules[module])
+            if cache:
+                cache.put_section(module, fingerprint, section)
+        doc.extend(section)
     
-    print(f"\nProcessed {total_processed} DocTypes total")
+    print(f"\nRendered {total_processed} DocTypes ({len(doctypes) - total_processed} reused from cache)")
     
     # Common Query Parameters
     doc.append("## Common Query Parameters")
@@ -288,25 +507,49 @@ def generate_documentation(session):
     doc.append("6. **Submittable Documents**: Support additional states (Draft, Submitted, Cancelled)")
     doc.append("")
     
+    if cache:
+        # Saved last: a run interrupted before this point refetches the list
+        # but still reuses every sample committed so far
+        cache.save_doctypes(doctypes)
+    
     return "\n".join(doc)
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate API_ENDPOINTS.md from a running ERPNext instance")
+    parser.add_argument("--full", action="store_true", help="clear the cache and rebuild everything")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the on-disk cache")
+    parser.add_argument("--output", default="API_ENDPOINTS.md", help="markdown file to write")
+    parser.add_argument("--concurrency", type=int, default=SAMPLE_CONCURRENCY,
+                        help=f"parallel sample fetches (default {SAMPLE_CONCURRENCY})")
+    args = parser.parse_args(argv)
+    
     print("=" * 50)
     print("ERPNext API Documentation Generator")
     print("=" * 50)
     print()
     
     # Login
-    session = login()
+    session = login(args.concurrency)
     if not session:
         print("Failed to login!")
-        return
+        sys.exit(1)
     
     # Generate documentation
-    documentation = generate_documentation(session)
+    cache = None if args.no_cache else DocsCache()
+    if cache and args.full:
+        cache.clear()
+    try:
+        documentation = generate_documentation(session, args.concurrency, cache)
+    except RuntimeError as e:
+        # Leave the cache and the existing output untouched
+        print(f"✗ {e}")
+        sys.exit(1)
+    finally:
+        if cache:
+            cache.close()
     
     # Save to file
-    output_file = "API_ENDPOINTS.md"
+    output_file = args.output
     with open(output_file, "w") as f:
         f.write(documentation)
     
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Mock ERPNext Server
+A localhost stand-in for the /api/resource, /api/method/login,
+getdoctype and upload_file surfaces (uploads are kept in memory and
+served back from their file_url), so the Python clients, doc generator
+and benchmarks can run without the docker-compose stack. Data is generated from a seed, and latency, jitter,
+5xx errors and 429 responses can be injected, at random or for the next
+requests to one path (fail_next). Deletes are recorded as Deleted Document
+rows, as frappe does.
+
+Examples:
+  python3 mock_erpnext_server.py --port 8090 --doctypes 200 --records 5000
+  python3 mock_erpnext_server.py --latency 20 --jitter 10 --error-rate 0.01 --rate-limit-rate 0.05
+  ERPNEXT_URL=http://localhost:8090 python3 generate_api_docs.py --no-cache
+
+In-process (e.g. from CI, see tests/):
+  with MockERPNextServer(MockConfig(records=1000, latency_ms=5)) as server:
+      client = ERPNextSecureClient(server.url)
+      client.authenticate_with_token(MOCK_API_KEY, MOCK_API_SECRET)
+      server.fail_next("/api/method/login", 503)  # The next login fails once
+"""
+
+import re
+import json
+import uuid
+import random
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+MOCK_USERNAME = "Administrator"
+MOCK_PASSWORD = "LocalDev123!"  # Same as the local stack, so existing scripts log in
+MOCK_API_KEY = "mock_key"
+MOCK_API_SECRET = "mock_secret"
+
+# DocTypes that always exist, with the module they are listed under
+STANDARD_DOCTYPES = {
+    "User": "Core", "DocType": "Core", "File": "Core", "Deleted Document": "Core",
+    "ToDo": "Desk", "Customer": "Selling", "Item": "Stock", "Sales Invoice": "Accounts",
+    "GL Entry": "Accounts", "Stock Ledger Entry": "Stock",
+}
+MODULES = ["Accounts", "Buying", "CRM", "Core", "Desk", "HR", "Manufacturing", "Projects",
+           "Selling", "Setup", "Stock", "Support"]
+STATUSES = ["Draft", "Open", "Paid", "Overdue", "Cancelled"]
+# Fields of generated documents, as getdoctype describes them
+MOCK_FIELDS = [
+    {"fieldname": "title", "fieldtype": "Data", "reqd": 1},
+    {"fieldname": "status", "fieldtype": "Select", "options": "\n".join(STATUSES)},
+    {"fieldname": "amount", "fieldtype": "Currency"},
+    {"fieldname": "qty", "fieldtype": "Int"},
+]
+DEFAULT_PAGE_LENGTH = 20  # frappe's default limit_page_length
+
+class MockConfig:
+    """Dataset size and fault injection settings for MockERPNextServer"""
+
+    def __init__(self, doctypes=50, records=100, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1, seed=42, ignore_as_dict=False):
+        self.doctypes = doctypes                # DocTypes in addition to STANDARD_DOCTYPES
+        self.records = records                  # Records per listable DocType
+        self.latency_ms = latency_ms            # Added to every response
+        self.jitter_ms = jitter_ms              # Uniform +/- spread around latency_ms
+        self.error_rate = error_rate            # Share of requests answered with 500
+        self.rate_limit_rate = rate_limit_rate  # Share of requests answered with 429
+        self.retry_after = retry_after          # Retry-After seconds sent with 429s
+        self.seed = seed
+        self.ignore_as_dict = ignore_as_dict    # Answer as_dict=0 with objects, like some servers
+
+class MockDataset:
+    """
+    Deterministic in-memory documents, generated lazily per DocType
+    modified timestamps repeat in small groups so keyset pagination over
+    (modified, name) meets ties like it does on a real site.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.docs = {}
+        self.counters = {}
+        rng = random.Random(config.seed)
+        self.doctypes = dict(STANDARD_DOCTYPES)
+        for i in range(config.doctypes):
+            self.doctypes[f"Mock DocType {i:04d}"] = rng.choice(MODULES)
+        self.flags = {}
+        for i, name in enumerate(sorted(self.doctypes)):
+            special = name not in STANDARD_DOCTYPES
+            self.flags[name] = {
+                "issingle": int(special and i % 17 == 0),
+                "istable": int(special and i % 11 == 0),
+                "is_submittable": int(name in ("Sales Invoice", "GL Entry") or (special and i % 5 == 0)),
+            }
+
+    def _generate(self, doctype):
+        base = datetime(2024, 1, 1)
+        if doctype == "DocType":
+            return {
+                name: {"name": name, "module": module, **self.flags[name], "owner": "Administrator",
+                       "creation": str(base), "modified": str(base + timedelta(minutes=i)), "docstatus": 0}
+                for i, (name, module) in enumerate(sorted(self.doctypes.items()))
+            }
+        if doctype == "Deleted Document" or self.flags[doctype]["issingle"] or self.flags[doctype]["istable"]:
+            return {}
+        rng = random.Random(f"{self.config.seed}:{doctype}")
+        prefix = re.sub(r"[^A-Z]", "", doctype.title())[:4] or "DOC"
+        docs = {}
+        for i in range(self.config.records):
+            name = f"{prefix}-{i:06d}"
+            stamp = str(base + timedelta(seconds=i // 3 * 7))
+            docs[name] = {
+                "name": name,
+                "owner": "Administrator",
+                "creation": stamp,
+                "modified": stamp,
+                "docstatus": 0,
+                "idx": 0,
+                "title": f"{doctype} {i}",
+                "status": rng.choice(STATUSES),
+                "amount": round(rng.uniform(1, 10000), 2),
+                "qty": rng.randint(1, 100),
+            }
+        self.counters[doctype] = self.config.records
+        return docs
+
+    def table(self, doctype):
+        """All documents of a DocType by name, or None if it does not exist"""
+        if doctype not in self.doctypes:
+            return None
+        with self.lock:
+            if doctype not in self.docs:
+                self.docs[doctype] = self._generate(doctype)
+            return self.docs[doctype]
+
+    def next_name(self, doctype):
+        with self.lock:
+            self.counters[doctype] = self.counters.get(doctype, 0) + 1
+            return f"{doctype.upper().replace(' ', '-')[:8]}-NEW-{self.counters[doctype]:06d}"
+
+def _matches(doc, field, op, value):
+    actual = doc.get(field)
+    op = op.lower()
+    if op in ("=", "=="):
+        return actual == value or (actual is not None and str(actual) == str(value))
+    if op == "!=":
+        return str(actual) != str(value)
+    if op in ("in", "not in"):
+        values = value if isinstance(value, list) else [v.strip() for v in str(value).split(",")]
+        return (actual in values) == (op == "in")
+    if op in ("like", "not like"):
+        pattern = "^" + re.escape(str(value)).replace("%", ".*").replace("_", ".") + "$"
+        return bool(re.match(pattern, str(actual or ""), re.IGNORECASE)) == (op == "like")
+    if op == "is":
+        return (actual not in (None, "")) == (value == "set")
+    if actual is None:
+        return False
+    if isinstance(actual, (int, float)) and not isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return False
+    elif not isinstance(actual, (int, float)):
+        actual, value = str(actual), str(value)
+    return {">": actual > value, ">=": actual >= value, "<": actual < value, "<=": actual <= value}.get(op, False)
+
+def _parse_filters(filters):
+    """Normalize frappe filters (list or dict form) into (field, op, value) tuples"""
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        return [(f, *v) if isinstance(v, list) else (f, "=", v) for f, v in filters.items()]
+    return [tuple(f[-3:]) for f in filters]
+
+def _sort_key(order_by):
+    """Sort keys for an "a asc, b desc" order_by clause, applied last to first"""
+    keys = []
+    for part in (order_by or "modified desc").split(","):
+        words = part.replace("`", "").split()
+        if not words:
+            continue
+        field = words[0].split(".")[-1]
+        keys.append((field, len(words) > 1 and words[1].lower() == "desc"))
+    return keys
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like nginx in front of gunicorn
+    server_version = "MockERPNext/1.0"
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # Plumbing
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {}, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        raw = self.raw_body
+        if not raw:
+            return {}
+        if "json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw)
+        return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+
+    def _inject(self):
+        """Apply latency and fault injection; returns True if a fault was sent"""
+        config = self.server.config
+        with self.server.rng_lock:
+            delay = config.latency_ms + self.server.rng.uniform(-config.jitter_ms, config.jitter_ms)
+            roll = self.server.rng.random()
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if roll < config.rate_limit_rate:
+            self._send(429, {"exc_type": "TooManyRequestsError"}, {"Retry-After": str(config.retry_after)})
+            return True
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._send(500, {"exc_type": "InternalServerError", "exception": "Injected failure"})
+            return True
+        return False
+
+    def _user(self):
+        """Authenticated user, or None; sends 401 for a wrong token"""
+        auth = self.headers.get("Authorization") or ""
+        if auth.startswith("token "):
+            if auth[6:] == f"{MOCK_API_KEY}:{MOCK_API_SECRET}":
+                return MOCK_USERNAME
+            self._send(401, {"exc_type": "AuthenticationError"})
+            return False
+        match = re.search(r"sid=([\w-]+)", self.headers.get("Cookie") or "")
+        if match and match.group(1) not in self.server.sessions:
+            self._send(401, {"exc_type": "SessionExpired"})
+            return False
+        user = self.server.sessions.get(match.group(1)) if match else None
+        if user is None:
+            self._send(403, {"exc_type": "PermissionError"})
+            return False
+        return user
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        self.query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        # Read the body up front so error responses leave the keep-alive connection clean
+        length = int(self.headers.get("Content-Length") or 0)
+        self.raw_body = self.rfile.read(length) if length else b""
+        self.server.count_request()
+        status = self.server.take_failure(url.path)
+        if status:
+            return self._send(status, {"exc_type": "InjectedFailure"})
+        if self._inject():
+            return
+
+        if parts[:2] == ["api", "method"] and len(parts) == 3:
+            if parts[2] == "login" and method == "POST":
+                return self.login()
+            if parts[2] == "logout":
+                return self.logout()
+            if parts[2] == "ping":
+                return self._send(200, {"message": "pong"})
+            if not self._user():
+                return
+            if parts[2] == "frappe.auth.get_logged_user":
+                return self._send(200, {"message": MOCK_USERNAME})
+            if parts[2] == "frappe.client.insert_many" and method == "POST":
+                return self.insert_many()
+            if parts[2] == "frappe.desk.form.load.getdoctype":
+                return self.getdoctype()
+            if parts[2] == "upload_file" and method == "POST":
+                return self.upload_file()
+            return self._send(404, {"exc_type": "DoesNotExistError"})
+
+        if parts[:2] == ["api", "resource"] and len(parts) in (3, 4):
+            if not self._user():
+                return
+            doctype = parts[2]
+            table = self.server.dataset.table(doctype)
+            if table is None:
+                return self._send(404, {"exc_type": "DoesNotExistError", "exception": f"DocType {doctype} not found"})
+            if len(parts) == 3:
+                return self.list(table) if method == "GET" else self.create(doctype, table)
+            return self.document(method, doctype, table, parts[3])
+
+        file_url = unquote(url.path)
+        if method == "GET" and file_url in self.server.files:
+            if file_url.startswith("/private/") and not self._user():
+                return
+            return self.file(file_url)
+
+        self._send(404, {"exc_type": "DoesNotExistError"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    # Endpoints
+    def login(self):
+        body = self._body()
+        if body.get("usr") != MOCK_USERNAME or body.get("pwd") != MOCK_PASSWORD:
+            return self._send(401, {"message": "Invalid login credentials"})
+        sid = uuid.uuid4().hex
+        self.server.sessions[sid] = MOCK_USERNAME
+        self._send(200, {"message": "Logged In", "full_name": MOCK_USERNAME},
+                   {"Set-Cookie": f"sid={sid}; Path=/; HttpOnly"})
+
+    def logout(self):
+        match = re.search(r"sid=([\w-]+)", self.headers.get("Cookie") or "")
+        if match:
+            self.server.sessions.pop(match.group(1), None)
+        self._send(200, {})
+
+    def list(self, table):
+        q = self.query
+        try:
+            fields = json.loads(q.get("fields") or '["name"]')
+            filters = _parse_filters(json.loads(q.get("filters") or "[]"))
+            start = int(q.get("limit_start") or 0)
+            length = int(q.get("limit_page_length") or q.get("limit") or DEFAULT_PAGE_LENGTH)
+        except (ValueError, TypeError) as e:
+            return self._send(417, {"exc_type": "ValidationError", "exception": str(e)})
+
+        rows = [doc for doc in list(table.values()) if all(_matches(doc, *f) for f in filters)]
+        for field, descending in reversed(_sort_key(q.get("order_by"))):
+            rows.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field)), reverse=descending)
+        rows = rows[start:start + length] if length else rows[start:]
+
+        fields = [f.replace("`", "").split(".")[-1].split(" as ")[-1] for f in fields]
+        if fields != ["*"]:
+            rows = [{f: doc.get(f) for f in fields} for doc in rows]
+        if q.get("as_dict") in ("0", "false", "False") and not self.server.config.ignore_as_dict:
+            rows = [list(row.values()) for row in rows]
+        self._send(200, {"data": rows})
+
+    def document(self, method, doctype, table, name):
+        if name not in table:
+            return self._send(404, {"exc_type": "DoesNotExistError",
+                                    "exception": f"{doctype} {name} not found"})
+        if method == "GET":
+            return self._send(200, {"data": {"doctype": doctype, **table[name]}})
+        if method == "DELETE":
+            del table[name]
+            self._insert("Deleted Document", self.server.dataset.table("Deleted Document"),
+                         {"deleted_doctype": doctype, "deleted_name": name})
+            return self._send(200, {"message": "ok"})
+        if method == "PUT":
+            updates = {k: v for k, v in self._body().items() if k not in ("name", "doctype")}
+            table[name].update(updates, modified=str(datetime.now()))
+            return self._send(200, {"data": {"doctype": doctype, **table[name]}})
+        self._send(405, {"exc_type": "MethodNotAllowed"})
+
+    def _insert(self, doctype, table, values):
+        now = str(datetime.now())
+        name = values.get("name") or self.server.dataset.next_name(doctype)
+        doc = {"owner": MOCK_USERNAME, "docstatus": 0, "idx": 0,
+               **{k: v for k, v in values.items() if k != "doctype"},
+               "name": name, "creation": now, "modified": now}
+        table[name] = doc
+        return doc
+
+    def create(self, doctype, table):
+        doc = self._insert(doctype, table, self._body())
+        self._send(200, {"data": {"doctype": doctype, **doc}})
+
+    def getdoctype(self):
+        doctype = self.query.get("doctype", "")
+        meta = self.server.dataset.table("DocType").get(doctype)
+        if meta is None:
+            return self._send(404, {"exc_type": "DoesNotExistError", "exception": f"DocType {doctype} not found"})
+        if self.query.get("cached_timestamp") == meta["modified"]:
+            return self._send(200, {"message": "use_cache"})
+        fields = [{**field, "idx": i + 1} for i, field in enumerate(MOCK_FIELDS)]
+        self._send(200, {"docs": [{**meta, "doctype": "DocType", "fields": fields}]})
+
+    def upload_file(self):
+        match = re.search(r"boundary=([^;]+)", self.headers.get("Content-Type") or "")
+        if not match:
+            return self._send(417, {"exc_type": "ValidationError", "exception": "No file attached"})
+        form, content, file_name = {}, None, None
+        for part in self.raw_body.split(b"--" + match.group(1).strip('"').encode())[1:-1]:
+            head, _, value = part[2:-2].partition(b"\r\n\r\n")
+            name = re.search(rb'name="([^"]*)"', head).group(1).decode()
+            filename = re.search(rb'filename="([^"]*)"', head)
+            if filename:
+                content, file_name = value, filename.group(1).decode()
+            else:
+                form[name] = value.decode()
+        if content is None:
+            return self._send(417, {"exc_type": "ValidationError", "exception": "No file attached"})
+        private = form.get("is_private") in ("1", "true")
+        file_url = f"{'/private' if private else ''}/files/{file_name}"
+        self.server.files[file_url] = content
+        self._send(200, {"message": {
+            "doctype": "File", "name": uuid.uuid4().hex[:10], "file_name": file_name, "file_url": file_url,
+            "file_size": len(content), "is_private": int(private), "folder": form.get("folder", "Home"),
+            "attached_to_doctype": form.get("doctype"), "attached_to_name": form.get("docname"),
+        }})
+
+    def file(self, file_url):
+        content = self.server.files[file_url]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def insert_many(self):
+        docs = self._body().get("docs") or []
+        if isinstance(docs, str):
+            docs = json.loads(docs)
+        names = []
+        for values in docs:
+            table = self.server.dataset.table(values.get("doctype"))
+            if table is None:
+                return self._send(417, {"exc_type": "ValidationError",
+                                        "exception": f"DocType {values.get('doctype')} not found"})
+            names.append(self._insert(values["doctype"], table, values)["name"])
+        self._send(200, {"message": names})
+
+class MockERPNextServer(ThreadingHTTPServer):
+    """
+    Threaded mock server, usable as a context manager
+    Binding to port 0 picks a free port; url holds the resulting address.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), MockRequestHandler)
+        self.config = config or MockConfig()
+        self.dataset = MockDataset(self.config)
+        self.rng = random.Random(self.config.seed)
+        self.rng_lock = threading.Lock()
+        self.sessions = {}
+        self.files = {}  # file_url -> content of uploaded files
+        self.failures = {}  # path -> [status, remaining count], see fail_next()
+        self.requests = 0
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self.rng_lock:
+            self.requests += 1
+
+    def start(self):
+        """Serve from a background thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def fail_next(self, path, status=503, count=1):
+        """Answer the next `count` requests to `path` with `status`"""
+        with self.rng_lock:
+            self.failures[path] = [status, count]
+
+    def take_failure(self, path):
+        """Status to fail a request to path with, or None"""
+        with self.rng_lock:
+            failure = self.failures.get(path)
+            if not failure:
+                return None
+            failure[1] -= 1
+            if failure[1] <= 0:
+                del self.failures[path]
+            return failure[0]
+
+    def expire_sessions(self):
+        """Drop every login session, as a server restart or session timeout would"""
+        self.sessions.clear()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock ERPNext API server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--doctypes", type=int, default=50, help="generated DocTypes besides the standard ones")
+    parser.add_argument("--records", type=int, default=100, help="records per listable DocType")
+    parser.add_argument("--latency", type=float, default=0, help="added latency per response (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="uniform +/- latency spread (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ignore-as-dict", action="store_true", help="return objects even for as_dict=0")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        doctypes=args.doctypes, records=args.records, latency_ms=args.latency, jitter_ms=args.jitter,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        seed=args.seed, ignore_as_dict=args.ignore_as_dict,
+    )
+    server = MockERPNextServer(config, args.host, args.port, verbose=args.verbose)
+    print(f"🧪 Mock ERPNext listening on {server.url}")
+    print(f"   Login: {MOCK_USERNAME} / {MOCK_PASSWORD}")
+    print(f"   Token: ERPNEXT_API_KEY={MOCK_API_KEY} ERPNEXT_API_SECRET={MOCK_API_SECRET}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        print(f"\n📊 Served {server.requests} requests")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Multi-site ERPNext Client Pool
+One ERPNextSecureClient per site behind a shared frontend. Clients share a
+single connection pool, while auth, rate limits and response caches stay
+per site. Queries can fan out across all sites in parallel.
+
+The frontend picks the site from the Host header, so the nginx container
+needs FRAPPE_SITE_NAME_HEADER=$$host instead of the fixed site name used in
+docker-compose.yml.
+
+Sites and their tokens are read from ERPNEXT_SITES, e.g.
+  ERPNEXT_SITES="site1.local=key1:secret1,site2.local=key2:secret2"
+
+Examples:
+  python3 multi_site_client.py Customer --fields name,customer_name
+  python3 multi_site_client.py "Sales Invoice" --filters '[["docstatus","=",1]]'
+"""
+
+import os
+import json
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from secure_api_client import (ERPNextSecureClient, RequestMetrics, ResponseCache, TimedHTTPAdapter,
+                               keepalive_socket_options)
+
+class SiteClientPool:
+    """
+    Routes requests to per-site clients that share one transport
+    Every client sends its site in the Host header over the same base_url,
+    so keep-alive connections are reused across sites. Each site keeps its
+    own session cookies/token, RateLimiter and ResponseCache (built from
+    cache_options when given); metrics are shared unless a site is given
+    its own.
+    """
+
+    def __init__(self, base_url="http://localhost:8080", pool_connections=4, pool_maxsize=32,
+                 pool_block=False, keepalive=True, workers=8, cache_options=None, **client_options):
+        self.base_url = base_url
+        self.workers = workers
+        self.adapter = TimedHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            socket_options=keepalive_socket_options() if keepalive else None,
+        )
+        self.metrics = client_options.pop('metrics', None) or RequestMetrics()
+        self.cache_options = cache_options
+        self.client_options = {'keepalive': keepalive, **client_options}
+        self.clients = {}
+
+    def add_site(self, site, base_url=None, **options):
+        """
+        Register a site and return its (unauthenticated) client
+        options override the pool's client options for this site, e.g.
+        rate_limit_per_minute=120 or cache=ResponseCache(). A site on a
+        different base_url gets its own connection pool from the adapter.
+        """
+        options = {'metrics': self.metrics, **self.client_options, **options}
+        if self.cache_options is not None and 'cache' not in options:
+            # Cache keys carry no site, so every site needs its own cache
+            options['cache'] = ResponseCache(**self.cache_options)
+        client = ERPNextSecureClient(base_url or self.base_url, site=site, adapter=self.adapter, **options)
+        self.clients[site] = client
+        return client
+
+    def client(self, site):
+        """The client for a registered site"""
+        try:
+            return self.clients[site]
+        except KeyError:
+            raise KeyError(f"Unknown site '{site}' (registered: {', '.join(self.clients) or 'none'})")
+
+    __getitem__ = client
+
+    @property
+    def sites(self):
+        return list(self.clients)
+
+    def authenticate_all(self, tokens):
+        """
+        Token-authenticate several sites: tokens maps site -> (api_key, api_secret)
+        Returns the sites that failed.
+        """
+        failed = []
+        for site, (api_key, api_secret) in tokens.items():
+            if not self.client(site).authenticate_with_token(api_key, api_secret):
+                failed.append(site)
+        return failed
+
+    def fan_out(self, fn, sites=None):
+        """
+        Call fn(client) for each site in parallel
+        Returns {site: result} and {site: exception} for the sites that raised.
+        """
+        sites = list(sites or self.clients)
+        results, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(sites)))) as executor:
+            futures = {site: executor.submit(fn, self.client(site)) for site in sites}
+            for site, future in futures.items():
+                try:
+                    results[site] = future.result()
+                except Exception as e:
+                    errors[site] = e
+        return results, errors
+
+    def list_all(self, doctype, fields=None, filters=None, order_by="name asc",
+                 page_size=500, sites=None, site_field="site"):
+        """
+        Fetch a DocType list from every site and merge the rows
+        Each row gets its site in site_field; rows come in site order.
+        Returns (rows, errors) where errors maps failed sites to exceptions.
+        """
+        fields = list(fields) if fields else ["*"]
+        results, errors = self.fan_out(
+            lambda client: client._list_all(doctype, fields, filters or [], order_by, page_size),
+            sites,
+        )
+        rows = [
+            {**row, site_field: site}
+            for site in (sites or self.clients) if site in results
+            for row in results[site]
+        ]
+        return rows, errors
+
+    def logout(self):
+        """Log every site out and release the shared connection pool"""
+        for client in self.clients.values():
+            client.logout()
+        self.adapter.close()
+
+def parse_sites(text):
+    """Parse "site=key:secret,..." into {site: (key, secret)}"""
+    tokens = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        site, _, credentials = part.partition("=")
+        api_key, _, api_secret = credentials.partition(":")
+        if not site or not api_key or not api_secret:
+            raise ValueError(f"Expected site=api_key:api_secret, got '{part}'")
+        tokens[site] = (api_key, api_secret)
+    return tokens
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a DocType across several ERPNext sites in parallel")
+    parser.add_argument("doctype")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    parser.add_argument("--sites", default=os.environ.get('ERPNEXT_SITES', ""),
+                        help="site=api_key:api_secret,... (default: ERPNEXT_SITES)")
+    parser.add_argument("--fields", help="comma-separated fields (default: all)")
+    parser.add_argument("--filters", help="JSON frappe filters applied on every site")
+    parser.add_argument("--workers", type=int, default=8, help="sites queried at once")
+    parser.add_argument("--rate-limit", type=float, help="requests per minute per site")
+    parser.add_argument("--output", help="write merged rows to this JSON file")
+    args = parser.parse_args()
+
+    tokens = parse_sites(args.sites)
+    if not tokens:
+        print("❌ No sites configured; set ERPNEXT_SITES or pass --sites")
+        return
+
+    pool = SiteClientPool(args.url, pool_maxsize=max(args.workers, 4), workers=args.workers,
+                          rate_limit_per_minute=args.rate_limit)
+    for site in tokens:
+        pool.add_site(site)
+    failed = pool.authenticate_all(tokens)
+    for site in failed:
+        print(f"⚠️  Skipping {site}: authentication failed")
+
+    started = time.monotonic()
+    rows, errors = pool.list_all(
+        args.doctype,
+        fields=args.fields.split(",") if args.fields else None,
+        filters=json.loads(args.filters) if args.filters else None,
+        sites=[site for site in tokens if site not in failed],
+    )
+    elapsed = time.monotonic() - started
+
+    counts = {}
+    for row in rows:
+        counts[row['site']] = counts.get(row['site'], 0) + 1
+    print(f"\n🌐 {args.doctype} across {len(counts) + len(errors)} sites ({elapsed:.2f}s)")
+    for site, count in counts.items():
+        print(f"   ✅ {site}: {count} rows")
+    for site, error in errors.items():
+        print(f"   ❌ {site}: {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2, default=str)
+        print(f"✓ {len(rows)} rows saved to: {args.output}")
+
+    pool.logout()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
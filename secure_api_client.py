@@ -5,31 +5,987 @@ Demonstrates best practices for API authentication and security
 """
 
 import os
+import sys
 import requests
 import json
-import getpass
 from datetime import datetime
-import hashlib
-import hmac
-from urllib.parse import urlparse
+import mimetypes
+import gzip
+import time
+import random
+from email.utils import parsedate_to_datetime
+import queue
+import sqlite3
+import atexit
+import threading
+import socket
+from collections import OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, quote, unquote
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_ijson = False
+
+def _load_ijson():
+    """
+    ijson (optional: incremental JSON decoding for streamed reads), or None
+    Imported on first use so short-lived CLI runs don't pay for it.
+    """
+    global _ijson
+    if _ijson is False:
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        _ijson = ijson
+    return _ijson
+
+# Per-thread connect timing filled in by the timed connection classes below
+_phase_timings = threading.local()
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _phase_timings.connect = getattr(_phase_timings, 'connect', 0.0) + time.perf_counter() - started
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _phase_timings.connect = getattr(_phase_timings, 'connect', 0.0) + time.perf_counter() - started
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+def keepalive_socket_options(idle=60, interval=15, count=4):
+    """TCP keep-alive socket options (probe timings where the OS supports them)"""
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', interval), ('TCP_KEEPCNT', count)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+def accept_encoding():
+    """Content codings urllib3 can decode here: gzip/deflate, plus br/zstd when installed"""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append("br")
+        except ImportError:
+            pass
+    try:
+        import zstandard  # noqa: F401
+        encodings.append("zstd")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections record DNS/connect (and TLS) time
+    socket_options are passed to every pooled connection, e.g. the TCP
+    keep-alive options from keepalive_socket_options().
+    """
+    
+    def __init__(self, *args, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(*args, **kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        if getattr(self, 'socket_options', None):
+            kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+class AuditLogWriter:
+    """
+    Queue-backed audit log writer
+    Callers enqueue entries without touching the filesystem; a background
+    thread appends them in batches, flushing every flush_interval seconds or
+    once flush_size entries are pending, and again at interpreter exit.
+    Files are rotated to path.1 ... path.N once they exceed max_bytes.
+    """
+    
+    _writers = {}
+    _writers_lock = threading.Lock()
+    
+    def __init__(self, path, fmt="text", flush_interval=1.0, flush_size=100,
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"audit-log:{path}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    @classmethod
+    def for_path(cls, path, **options):
+        """
+        Return the shared writer for a log file, creating it on first use
+        Raises ValueError when the file is already written in another format:
+        one file must not mix text and JSON lines.
+        """
+        with cls._writers_lock:
+            writer = cls._writers.get(path)
+            if writer is None or writer._closed:
+                writer = cls._writers[path] = cls(path, **options)
+            elif options.get('fmt', "text") != writer.fmt:
+                raise ValueError(f"{path} is already written as {writer.fmt}, not {options.get('fmt', 'text')}; "
+                                 f"use one log_format per process")
+            return writer
+    
+    def write(self, record):
+        """Enqueue a log record (dict); never blocks on I/O"""
+        if not self._closed:
+            self._queue.put(record)
+    
+    def close(self):
+        """Flush pending entries and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+    
+    def _format(self, record):
+        if self.fmt == "json":
+            fields = {k: v for k, v in record.items() if k != 'line'}
+            return json.dumps(fields, default=str) + "\n"
+        return record.get('line', '') + "\n"
+    
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                record = False
+            
+            if record is None:
+                self._flush(pending)
+                return
+            if record:
+                pending.append(self._format(record))
+            if len(pending) >= self.flush_size or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+    
+    def _flush(self, lines):
+        if not lines:
+            return
+        try:
+            self._rotate_if_needed()
+            with open(self.path, 'a') as f:
+                f.write("".join(lines))
+        except OSError:
+            pass  # Don't fail if logging fails
+    
+    def _rotate_if_needed(self):
+        if not self.max_bytes or not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < self.max_bytes:
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket with adaptive rate
+    Share one instance across threads (or clients) to keep the combined send
+    rate under the server limit. backoff() halves the rate and pauses all
+    callers, e.g. after a 429/503; success() recovers it gradually.
+    """
+    
+    def __init__(self, rate_per_minute=60, burst=None, min_rate_per_minute=6):
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = min(min_rate_per_minute, rate_per_minute) / 60.0
+        self.rate = self.max_rate
+        self.capacity = burst or max(1, rate_per_minute // 10)
+        self.tokens = float(self.capacity)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_time)
+    
+    def backoff(self, delay=0):
+        """Slow down after the server pushed back"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+    
+    def success(self):
+        """Additively recover towards the configured rate"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache for GET responses
+    Entries expire after a per-DocType TTL (falling back to default_ttl) and
+    are then revalidated with If-None-Match/If-Modified-Since when the server
+    sent an ETag or Last-Modified header. Cached payloads are shared, so
+    treat them as read-only.
+    """
+    
+    def __init__(self, default_ttl=60, ttls=None, max_entries=1024):
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def doctype_for(endpoint):
+        """DocType addressed by a /api/resource/... endpoint, or None"""
+        parts = endpoint.split('?', 1)[0].strip('/').split('/')
+        if len(parts) >= 3 and parts[0] == 'api' and parts[1] == 'resource':
+            return unquote(parts[2])
+        return None
+    
+    @staticmethod
+    def key_for(endpoint, params):
+        return (endpoint, json.dumps(params or {}, sort_keys=True, default=str))
+    
+    def lookup(self, key):
+        """Return (entry, fresh) for a key; entry is None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = time.monotonic() < entry['expires']
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry, fresh
+    
+    def store(self, key, data, headers):
+        doctype = self.doctype_for(key[0])
+        ttl = self.ttls.get(doctype, self.default_ttl)
+        entry = {
+            'data': data,
+            'doctype': doctype,
+            'expires': time.monotonic() + ttl,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def refresh(self, key, entry):
+        """Extend an entry after a 304 Not Modified"""
+        ttl = self.ttls.get(entry['doctype'], self.default_ttl)
+        with self._lock:
+            entry['expires'] = time.monotonic() + ttl
+            self.revalidated += 1
+    
+    def invalidate(self, doctype=None):
+        """Drop entries for a DocType, or everything when doctype is None"""
+        with self._lock:
+            if doctype is None:
+                self._entries.clear()
+                return
+            for key in [k for k, e in self._entries.items() if e['doctype'] == doctype]:
+                del self._entries[key]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+class DocTypeMeta:
+    """
+    DocType metadata from frappe.desk.form.load.getdoctype with lookup indexes
+    fields maps fieldname -> field definition for every field that holds a
+    value; links, dynamic_links and tables map fieldnames to their target
+    DocType (or, for Dynamic Link, the field naming it). Child table metas
+    are in children.
+    """
+    
+    # Layout-only field types without a database column
+    NO_VALUE_TYPES = {'Section Break', 'Column Break', 'Tab Break', 'HTML', 'Button',
+                      'Heading', 'Fold', 'Image'}
+    STANDARD_FIELDS = ('name', 'owner', 'creation', 'modified', 'modified_by', 'docstatus', 'idx')
+    CHILD_FIELDS = ('parent', 'parentfield', 'parenttype')
+    
+    def __init__(self, doc, children=None):
+        self.doc = doc
+        self.name = doc['name']
+        self.modified = doc.get('modified')
+        self.istable = bool(doc.get('istable'))
+        self.issingle = bool(doc.get('issingle'))
+        self.fields = {
+            f['fieldname']: f for f in doc.get('fields', [])
+            if f.get('fieldname') and f.get('fieldtype') not in self.NO_VALUE_TYPES
+        }
+        self.links = {n: f.get('options') for n, f in self.fields.items() if f['fieldtype'] == 'Link'}
+        self.dynamic_links = {n: f.get('options') for n, f in self.fields.items() if f['fieldtype'] == 'Dynamic Link'}
+        self.tables = {n: f.get('options') for n, f in self.fields.items()
+                       if f['fieldtype'] in ('Table', 'Table MultiSelect')}
+        self.mandatory = [n for n, f in self.fields.items() if f.get('reqd') and n not in self.tables]
+        self.children = children or {}
+    
+    @classmethod
+    def from_docs(cls, docs):
+        """Build from getdoctype's docs list (the DocType first, then its child tables)"""
+        children = {doc['name']: cls(doc) for doc in docs[1:] if doc.get('doctype', 'DocType') == 'DocType'}
+        return cls(docs[0], children)
+    
+    def to_docs(self):
+        return [self.doc] + [child.doc for child in self.children.values()]
+    
+    def has_field(self, fieldname):
+        return (fieldname in self.fields or fieldname in self.STANDARD_FIELDS
+                or (self.istable and fieldname in self.CHILD_FIELDS))
+    
+    def unknown_fields(self, fieldnames):
+        """Fieldnames (ignoring "*" and SQL expressions) this DocType does not have"""
+        return [f for f in fieldnames if f != '*' and _attribute_name(f) == f and not self.has_field(f)]
+    
+    def project(self, record, fieldnames=None):
+        """Copy of record restricted to known fields (or to fieldnames)"""
+        keep = fieldnames or [f for f in record if self.has_field(f)]
+        return {f: record.get(f) for f in keep if f in record}
+    
+    def validate(self, record, insert=True):
+        """
+        List of problems with a record, checked locally: unknown fields,
+        missing mandatory values (on insert) and the same for child rows
+        """
+        problems = [f"unknown field '{f}'" for f in record if f != 'doctype' and not self.has_field(f)]
+        if insert:
+            problems += [f"missing mandatory field '{f}'" for f in self.mandatory if record.get(f) in (None, '', [])]
+        for fieldname, child_doctype in self.tables.items():
+            child = self.children.get(child_doctype)
+            for i, row in enumerate(record.get(fieldname) or []):
+                if child is not None and isinstance(row, dict):
+                    problems += [f"{fieldname}[{i}]: {p}" for p in child.validate(row, insert)]
+        return problems
+
+META_CACHE_FILE = ".erpnext_meta_cache.db"
+
+class MetadataCache:
+    """
+    Store for DocTypeMeta, in memory and optionally in a SQLite file
+    Entries are keyed by site and DocType and trusted for ttl seconds after
+    they were last checked; after that, get_meta() revalidates them against
+    the server's `modified`. The file carries a format version and is
+    emptied when it does not match VERSION.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path=None, ttl=300):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}  # (site, doctype) -> [DocTypeMeta, checked_at]
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS meta (
+                    site TEXT, doctype TEXT, modified TEXT, docs TEXT, checked_at REAL,
+                    PRIMARY KEY (site, doctype)
+                );
+            """)
+            row = self._db.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+            if row is None or int(row[0]) != self.VERSION:
+                with self._db:
+                    self._db.execute("DELETE FROM meta")
+                    self._db.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('version', ?)",
+                                     (str(self.VERSION),))
+    
+    def get(self, site, doctype):
+        """Return (meta, checked_at) or None"""
+        with self._lock:
+            entry = self._entries.get((site, doctype))
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT docs, checked_at FROM meta WHERE site = ? AND doctype = ?",
+                                       (site, doctype)).fetchone()
+                if row:
+                    entry = self._entries[(site, doctype)] = [DocTypeMeta.from_docs(json.loads(row[0])), row[1]]
+            return tuple(entry) if entry else None
+    
+    def put(self, site, meta, checked_at):
+        with self._lock:
+            self._entries[(site, meta.name)] = [meta, checked_at]
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO meta (site, doctype, modified, docs, checked_at) VALUES (?, ?, ?, ?, ?)",
+                        (site, meta.name, meta.modified, json.dumps(meta.to_docs(), default=str), checked_at)
+                    )
+    
+    def touch(self, site, doctype, checked_at):
+        """Record that a cached entry was confirmed current"""
+        with self._lock:
+            if (site, doctype) in self._entries:
+                self._entries[(site, doctype)][1] = checked_at
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("UPDATE meta SET checked_at = ? WHERE site = ? AND doctype = ?",
+                                     (checked_at, site, doctype))
+    
+    def invalidate(self, site=None, doctype=None):
+        with self._lock:
+            for key in [k for k in self._entries if (site is None or k[0] == site) and (doctype is None or k[1] == doctype)]:
+                del self._entries[key]
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM meta WHERE (? IS NULL OR site = ?) AND (? IS NULL OR doctype = ?)",
+                                     (site, site, doctype, doctype))
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class ProjectedRecord:
+    """
+    Base class for compact rows returned by iter_projected()
+    Subclasses are generated per field list by record_type() and store
+    values in __slots__ instead of a per-row dict.
+    """
+    
+    __slots__ = ()
+    _fields = ()
+    
+    def __init__(self, values):
+        for attr, value in zip(self.__slots__, values):
+            setattr(self, attr, value)
+    
+    def __iter__(self):
+        return (getattr(self, attr, None) for attr in self.__slots__)
+    
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+    
+    def __repr__(self):
+        values = ", ".join(f"{attr}={getattr(self, attr, None)!r}" for attr in self.__slots__)
+        return f"{type(self).__name__}({values})"
+    
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+_record_types = {}
+_record_types_lock = threading.Lock()
+
+def _attribute_name(field):
+    """Python attribute name for a frappe field spec, e.g. `tabItem`.name or sum(qty) as total_qty"""
+    lowered = field.lower()
+    if " as " in lowered:
+        field = field[lowered.rindex(" as ") + 4:]
+    field = field.strip().strip('`').split('.')[-1].strip('`')
+    name = "".join(c if c.isalnum() or c == '_' else '_' for c in field) or "field"
+    return f"_{name}" if name[0].isdigit() else name
+
+def record_type(doctype, fields):
+    """Return the (cached) __slots__ record class for a DocType and field list"""
+    key = (doctype, tuple(fields))
+    with _record_types_lock:
+        cls = _record_types.get(key)
+        if cls is None:
+            class_name = "".join(c for c in doctype.title() if c.isalnum()) + "Record"
+            cls = _record_types[key] = type(class_name, (ProjectedRecord,), {
+                '__slots__': tuple(_attribute_name(f) for f in fields),
+                '_fields': tuple(fields),
+            })
+        return cls
+
+class LatencyHistogram:
+    """
+    Fixed-bucket histogram (Prometheus-style)
+    Memory does not grow with the number of observations; percentiles are
+    interpolated within the matching bucket.
+    """
+    
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+    
+    def __init__(self):
+        self.counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value):
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+    
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            if count and cumulative + count >= target:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (target - cumulative) / count
+            cumulative += count
+            lower = bound
+        return lower
+
+class RequestMetrics:
+    """
+    In-process request metrics keyed by (method, route)
+    Routes collapse document names, so /api/resource/Item/ITEM-0001 is
+    recorded as "/api/resource/Item/:name". Phases are connect (DNS, TCP and
+    TLS for new connections), ttfb (request sent until headers) and download
+    (body read).
+    """
+    
+    PHASES = ('total', 'connect', 'ttfb', 'download')
+    
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def route_for(endpoint):
+        path = endpoint.split('?', 1)[0]
+        parts = path.strip('/').split('/')
+        if len(parts) >= 4 and parts[0] == 'api' and parts[1] == 'resource':
+            return f"/api/resource/{unquote(parts[2])}/:name"
+        if len(parts) >= 2 and parts[-2] == 'files':
+            return f"/{'/'.join(parts[:-1])}/:name"
+        return unquote(path)
+    
+    def observe(self, method, endpoint, status, connect, ttfb, download, size):
+        key = (method, self.route_for(endpoint))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'latency': {phase: LatencyHistogram() for phase in self.PHASES},
+                    'bytes': 0,
+                    'statuses': Counter(),
+                }
+            latency = series['latency']
+            latency['total'].observe(connect + ttfb + download)
+            latency['connect'].observe(connect)
+            latency['ttfb'].observe(ttfb)
+            latency['download'].observe(download)
+            series['bytes'] += size
+            series['statuses'][status] += 1
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+    
+    def summary(self):
+        """Per-route stats: counts, bytes, status codes and p50/p95/p99 per phase (seconds)"""
+        with self._lock:
+            result = []
+            for (method, route), series in sorted(self._series.items()):
+                total = series['latency']['total']
+                result.append({
+                    'method': method,
+                    'route': route,
+                    'count': total.count,
+                    'bytes': series['bytes'],
+                    'statuses': dict(series['statuses']),
+                    'latency': {
+                        phase: {
+                            'p50': round(h.percentile(0.50), 4),
+                            'p95': round(h.percentile(0.95), 4),
+                            'p99': round(h.percentile(0.99), 4),
+                            'mean': round(h.sum / h.count, 4) if h.count else 0.0,
+                        }
+                        for phase, h in series['latency'].items()
+                    },
+                })
+            return result
+    
+    def report(self):
+        """Human-readable latency table, slowest routes first"""
+        rows = sorted(self.summary(), key=lambda r: r['latency']['total']['p95'], reverse=True)
+        lines = [
+            f"{'METHOD':<7} {'ROUTE':<45} {'COUNT':>6} {'P50':>8} {'P95':>8} {'P99':>8} "
+            f"{'TTFB95':>8} {'KB':>9} ERRORS",
+        ]
+        for row in rows:
+            total = row['latency']['total']
+            errors = sum(n for status, n in row['statuses'].items() if status == 0 or status >= 400)
+            lines.append(
+                f"{row['method']:<7} {row['route'][:45]:<45} {row['count']:>6} "
+                f"{total['p50']:>8.3f} {total['p95']:>8.3f} {total['p99']:>8.3f} "
+                f"{row['latency']['ttfb']['p95']:>8.3f} {row['bytes'] / 1024:>9.1f} {errors}"
+            )
+        return "\n".join(lines)
+    
+    def to_prometheus(self, prefix="erpnext_client"):
+        """Export in the Prometheus text exposition format"""
+        def labels(method, route, **extra):
+            pairs = {'method': method, 'route': route, **extra}
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for v in pairs.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(pairs, escaped)) + "}"
+        
+        out = [
+            f"# HELP {prefix}_request_duration_seconds ERPNext API request latency by phase",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+            for (method, route), series in items:
+                for phase, h in series['latency'].items():
+                    cumulative = 0
+                    for bound, count in zip(h.BUCKETS, h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        out.append(f"{prefix}_request_duration_seconds_bucket"
+                                   f"{labels(method, route, phase=phase, le=le)} {cumulative}")
+                    out.append(f"{prefix}_request_duration_seconds_sum{labels(method, route, phase=phase)} {h.sum}")
+                    out.append(f"{prefix}_request_duration_seconds_count{labels(method, route, phase=phase)} {h.count}")
+            out.append(f"# HELP {prefix}_response_bytes_total Response body bytes received")
+            out.append(f"# TYPE {prefix}_response_bytes_total counter")
+            for (method, route), series in items:
+                out.append(f"{prefix}_response_bytes_total{labels(method, route)} {series['bytes']}")
+            out.append(f"# HELP {prefix}_responses_total Responses by status code (0 = transport error)")
+            out.append(f"# TYPE {prefix}_responses_total counter")
+            for (method, route), series in items:
+                for status, count in sorted(series['statuses'].items()):
+                    out.append(f"{prefix}_responses_total{labels(method, route, status=status)} {count}")
+        return "\n".join(out) + "\n"
+
+class BatchReport:
+    """
+    Result of a bulk operation run through _run_bounded()
+    Items are identified by their position in the input iterable.
+    Subclasses add their own totals to summary() via _totals().
+    """
+    
+    def __init__(self):
+        self.succeeded = []  # (index, result)
+        self.failed = []     # (index, error message)
+        self.elapsed = 0.0
+    
+    def finish(self, started):
+        """Record the elapsed time and order the results by index"""
+        self.elapsed = time.monotonic() - started
+        self.succeeded.sort(key=lambda item: item[0])
+        self.failed.sort(key=lambda item: item[0])
+        return self
+    
+    def _totals(self):
+        return {}
+    
+    def summary(self):
+        """Compact dict suitable for logging or JSON output"""
+        return {
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'elapsed_s': round(self.elapsed, 3),
+            **self._totals(),
+            'failures': self.failed[:20],
+        }
+
+def _run_bounded(func, items, workers, max_in_flight=None):
+    """
+    Call func(item) for every item on a thread pool
+    At most max_in_flight calls (default workers * 2) are pending at once,
+    so huge iterables are consumed lazily. Exceptions from func propagate.
+    """
+    max_in_flight = max_in_flight or workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for item in items:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            in_flight.add(executor.submit(func, item))
+        for future in wait(in_flight).done:
+            future.result()
+
+class BulkUpsertReport(BatchReport):
+    """
+    Result of ERPNextSecureClient.bulk_upsert()
+    succeeded holds (index, document name); batch inserts report a name of
+    None because frappe returns their names unordered.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.timings = []    # seconds per HTTP call
+    
+    def _totals(self):
+        timings = sorted(self.timings)
+        return {
+            'requests': len(timings),
+            'avg_request_s': round(sum(timings) / len(timings), 4) if timings else 0,
+            'max_request_s': round(timings[-1], 4) if timings else 0,
+        }
+
+class MultipartFileBody:
+    """
+    multipart/form-data body that streams one file from disk
+    Form fields go before the file part. The total size is known up front,
+    so requests sends a Content-Length and reads the body in blocks instead
+    of building it in memory. seek(0) rewinds it for a resend.
+    """
+    
+    def __init__(self, path, fields=None, field_name='file', file_name=None, content_type=None):
+        self.path = path
+        self.boundary = os.urandom(16).hex()
+        file_name = (file_name or os.path.basename(path)).replace('"', '%22')
+        content_type = content_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+        head = "".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in (fields or {}).items() if value is not None
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; '
+                 f'filename="{file_name}"\r\nContent-Type: {content_type}\r\n\r\n')
+        self._head = head.encode()
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._size = len(self._head) + os.path.getsize(path) + len(self._tail)
+        self._file = None
+        self.seek(0)
+    
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+    
+    def __len__(self):
+        return self._size
+    
+    def seek(self, offset, whence=0):
+        if offset != 0 or whence != 0:
+            raise ValueError("MultipartFileBody can only be rewound to the start")
+        self.close()
+        self._file = open(self.path, 'rb')
+        self._parts = [self._head, self._file, self._tail]
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._size
+        out = bytearray()
+        while len(out) < size and self._parts:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                taken = part[:size - len(out)]
+                out += taken
+                if len(taken) < len(part):
+                    self._parts[0] = part[len(taken):]
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part.read(size - len(out))
+                if chunk:
+                    out += chunk
+                else:
+                    self._parts.pop(0)
+        return bytes(out)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class FileTransferReport(BatchReport):
+    """
+    Result of ERPNextSecureClient.upload_files() / download_files()
+    succeeded holds (index, file_url or local path).
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.bytes = 0
+        self._lock = threading.Lock()
+    
+    def add(self, index, result, size):
+        with self._lock:
+            self.succeeded.append((index, result))
+            self.bytes += size
+    
+    def _totals(self):
+        return {
+            'bytes': self.bytes,
+            'mb_per_s': round(self.bytes / self.elapsed / 1e6, 2) if self.elapsed else 0,
+        }
+
+class ReportResult:
+    """
+    Result of ERPNextSecureClient.run_report()
+    Iterating yields lists of up to chunk_size rows; the request is only
+    sent when iteration starts. columns is set once it has been decoded
+    (before the first chunk for prepared reports, possibly only after the
+    last one for direct runs, where frappe sends it after the rows).
+    """
+    
+    def __init__(self, report_name):
+        self.report_name = report_name
+        self.columns = None
+        self.prepared_report = None  # Name of the Prepared Report, if one was used
+        self.rows = 0
+        self._chunks = None
+    
+    def __iter__(self):
+        return self._chunks
+    
+    def all_rows(self):
+        """Collect every row into one list (only for reports that fit in memory)"""
+        return [row for chunk in self for row in chunk]
+
+class ReauthenticationError(requests.exceptions.RequestException):
+    """A request got 401 and logging in again failed"""
 
 class ERPNextSecureClient:
     """
     Secure ERPNext API Client with multiple authentication methods
     """
     
-    def __init__(self, base_url="http://localhost:8080"):
+    RETRY_STATUSES = (429, 503)
+    REAUTH_ATTEMPTS = 3  # Re-login tries (with backoff) after a 401
+    REAUTH_COOLDOWN = 30  # Seconds a failed re-login is not retried
+    
+    def __init__(self, base_url="http://localhost:8080", log_format="text",
+                 rate_limit_per_minute=None, rate_limiter=None, max_retries=3,
+                 backoff_base=0.5, backoff_max=30, cache=None, metrics=None,
+                 pool_connections=4, pool_maxsize=32, pool_block=False,
+                 connect_timeout=5, read_timeout=60, keepalive=True, compression=True,
+                 site=None, adapter=None, auto_reauth=True, token_provider=None, metadata=None,
+                 interactive=None):
         self.base_url = base_url.rstrip('/')
+        self.site = site
         self.session = requests.Session()
         self.auth_method = None
         
+        # Connection pool: pool_maxsize connections per host are kept alive for
+        # reuse; with pool_block=True extra threads wait instead of opening
+        # throwaway connections. Pass a shared adapter to reuse another
+        # client's pool (see SiteClientPool).
+        self.timeout = (connect_timeout, read_timeout)
+        if adapter is None:
+            adapter = TimedHTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                socket_options=keepalive_socket_options() if keepalive else None,
+            )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Per-route latency/size/status metrics (share one RequestMetrics across clients if needed)
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        
+        # Opt-in GET response cache (a ResponseCache instance)
+        self.cache = cache
+        
+        # DocType metadata for get_meta(); pass MetadataCache(path) to persist it
+        self.metadata = metadata if metadata is not None else MetadataCache()
+        
+        # Rate limiting and 429/503 backoff (frappe defaults to 60 req/min)
+        if rate_limiter is None and rate_limit_per_minute:
+            rate_limiter = RateLimiter(rate_limit_per_minute)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        # Transparent re-authentication on 401: the first thread to see it logs
+        # in again while the others wait, then every failed request is replayed.
+        # Session logins keep their credentials in memory for this; token auth
+        # can only recover through token_provider() -> (api_key, api_secret).
+        # If every re-login attempt fails the request raises
+        # ReauthenticationError, and 401s within REAUTH_COOLDOWN fail fast.
+        self.auto_reauth = auto_reauth
+        self.token_provider = token_provider
+        self._credentials = None
+        self._auth_lock = threading.Lock()
+        self._auth_ready = threading.Event()
+        self._auth_ready.set()
+        self._auth_generation = 0
+        self._reauth_failed = None  # (generation, monotonic time) of the last failed re-login
+        self._keepalive_thread = None
+        self._keepalive_stop = threading.Event()
+        
+        # Prompt for missing credentials only on a terminal (never in cron or containers)
+        self.interactive = sys.stdin.isatty() if interactive is None else interactive
+        
+        # Audit logs are written in the background ("text" or "json" lines)
+        self.security_log = AuditLogWriter.for_path('api_security.log', fmt=log_format)
+        self.request_log = AuditLogWriter.for_path('api_requests.log', fmt=log_format)
+        
         # Security headers
         self.session.headers.update({
             'User-Agent': 'ERPNext-Secure-Client/1.0',
             'Accept': 'application/json',
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive' if keepalive else 'close',
+            'Accept-Encoding': accept_encoding() if compression else 'identity',
         })
         
+        # Multi-tenant benches pick the site from the Host header (or
+        # X-Frappe-Site-Name when talking to gunicorn directly)
+        if site:
+            self.session.headers.update({'Host': site, 'X-Frappe-Site-Name': site})
+        
         # Verify SSL in production
         if urlparse(base_url).scheme == 'https':
             self.session.verify = True
@@ -41,23 +997,31 @@ class ERPNextSecureClient:
         Login using username/password (creates session cookie)
         SECURITY: Use only for web applications, not for API clients
         """
+        if not (username and password) and not self.interactive:
+            print("❌ Username and password are required when prompting is disabled")
+            return False
         if not username:
-            username = input("Username: ")
+            username = self._prompt("Username")
         if not password:
-            password = getpass.getpass("Password: ")
+            password = self._prompt("Password", secret=True)
         
         login_data = {"usr": username, "pwd": password}
         
         try:
             response = self.session.post(
                 f"{self.base_url}/api/method/login",
-                json=login_data
+                json=login_data,
+                timeout=self.timeout
             )
             response.raise_for_status()
             
             result = response.json()
             if "message" in result and "Logged In" in result["message"]:
                 self.auth_method = "session"
+                self.current_user = username
+                self._clear_cache()
+                if self.auto_reauth:
+                    self._credentials = (username, password)
                 print("✅ Logged in successfully (session-based)")
                 self._log_auth_event("LOGIN_SUCCESS", username)
                 return True
@@ -76,28 +1040,32 @@ class ERPNextSecureClient:
         Setup token-based authentication
         SECURITY: Recommended for API clients and server-to-server communication
         """
-        if not api_key:
-            api_key = os.environ.get('ERPNEXT_API_KEY')
-            if not api_key:
-                api_key = input("API Key: ")
+        api_key = api_key or os.environ.get('ERPNEXT_API_KEY')
+        api_secret = api_secret or os.environ.get('ERPNEXT_API_SECRET')
+        if not (api_key and api_secret) and not self.interactive:
+            print("❌ Set ERPNEXT_API_KEY and ERPNEXT_API_SECRET (prompting is disabled)")
+            return False
         
+        if not api_key:
+            api_key = self._prompt("API Key")
         if not api_secret:
-            api_secret = os.environ.get('ERPNEXT_API_SECRET')
-            if not api_secret:
-                api_secret = getpass.getpass("API Secret: ")
+            api_secret = self._prompt("API Secret", secret=True)
         
         self.api_key = api_key
         self.api_secret = api_secret
         self.auth_method = "token"
+        self._clear_cache()
         
         # Update session headers for token auth
         self.session.headers.update({
             'Authorization': f'token {api_key}:{api_secret}'
         })
         
-        # Test the token
+        # Test the token (never answered from the cache)
         try:
-            response = self.get('/api/resource/User', params={'limit_page_length': 1})
+            response = self._make_secure_request('GET', '/api/resource/User', params={'limit_page_length': 1})
+            if response is None:
+                raise Exception("Token rejected")
             print("✅ Token authentication successful")
             self._log_auth_event("TOKEN_AUTH_SUCCESS", api_key[:8] + "...")
             return True
@@ -106,6 +1074,13 @@ class ERPNextSecureClient:
             self._log_auth_event("TOKEN_AUTH_FAILED", api_key[:8] + "...", str(e))
             return False
     
+    def _prompt(self, label, secret=False):
+        """Ask for a missing credential on the terminal"""
+        if secret:
+            import getpass  # Only interactive runs need it
+            return getpass.getpass(f"{label}: ")
+        return input(f"{label}: ")
+    
     def generate_api_key_instructions(self):
         """
         Print instructions for generating API keys
@@ -127,18 +1102,26 @@ class ERPNextSecureClient:
     def _log_auth_event(self, event, user, details=""):
         """Log authentication events for security audit"""
         timestamp = datetime.now().isoformat()
-        log_entry = f"{timestamp} - {event} - User: {user} - {details}\n"
-        
-        try:
-            with open('api_security.log', 'a') as f:
-                f.write(log_entry)
-        except:
-            pass  # Don't fail if logging fails
+        self.security_log.write({
+            'timestamp': timestamp,
+            'event': event,
+            'user': user,
+            'details': details,
+            'line': f"{timestamp} - {event} - User: {user} - {details}",
+        })
     
     def _make_secure_request(self, method, endpoint, **kwargs):
         """
         Make secure API request with proper error handling and logging
         """
+        response = self._send_request(method, endpoint, **kwargs)
+        return self._handle_response(response)
+    
+    def _send_request(self, method, endpoint, **kwargs):
+        """
+        Send a request with audit headers, rate limiting and 429/503 retries
+        Returns the raw response; errors are logged and re-raised.
+        """
         if self.auth_method != "session" and self.auth_method != "token":
             raise Exception("Not authenticated. Use login_with_credentials() or authenticate_with_token()")
         
@@ -151,70 +1134,1023 @@ class ERPNextSecureClient:
         
         # Make request
         try:
-            response = self.session.request(method, f"{self.base_url}{endpoint}", **kwargs)
+            # Hold new requests while another thread is re-authenticating
+            self._auth_ready.wait()
+            generation = self._auth_generation
+            response = self._send_with_retries(method, endpoint, **kwargs)
+            
+            if response.status_code == 401 and self._can_reauthenticate():
+                response.close()
+                if not self._reauthenticate(generation):
+                    raise ReauthenticationError(f"{method} {endpoint} got 401 and re-authentication failed")
+                kwargs['headers']['X-Request-Time'] = datetime.now().isoformat()
+                response = self._send_with_retries(method, endpoint, **kwargs)
+            
+            return response
+            
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Request failed: {e}")
+            self._log_request(method, endpoint, 0, str(e))
+            raise
+    
+    def _send_with_retries(self, method, endpoint, **kwargs):
+        """Send a request, retrying 429/503 responses with backoff"""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            response = self._timed_request(method, endpoint, **kwargs)
             
             # Log request for audit
             self._log_request(method, endpoint, response.status_code)
             
-            # Handle authentication errors
-            if response.status_code == 401:
-                print("❌ Authentication failed. Token may be expired.")
-                return None
-            elif response.status_code == 403:
-                print("❌ Access forbidden. Check permissions.")
-                return None
-            elif response.status_code == 429:
-                print("❌ Rate limit exceeded. Please wait.")
-                return None
+            if response.status_code not in self.RETRY_STATUSES:
+                if self.rate_limiter:
+                    self.rate_limiter.success()
+                break
             
+            delay = self._retry_delay(response, attempt)
+            response.close()  # Release the connection of an unread streamed body
+            if self.rate_limiter:
+                self.rate_limiter.backoff(delay)
+            if attempt < self.max_retries:
+                print(f"⏳ Server busy ({response.status_code}). Retrying in {delay:.1f}s "
+                      f"({attempt + 1}/{self.max_retries})...")
+                time.sleep(delay)
+        
+        return response
+    
+    def _can_reauthenticate(self):
+        """Whether a 401 can be recovered from by logging in again"""
+        if not self.auto_reauth:
+            return False
+        return bool((self.auth_method == "session" and self._credentials) or self.token_provider)
+    
+    def _reauthenticate(self, generation):
+        """
+        Log in again after a 401, once for all threads
+        generation is the auth generation the failed request was sent under;
+        if another thread has already renewed the credentials since, this
+        returns True at once so the caller just replays its request. The
+        login is tried REAUTH_ATTEMPTS times with backoff; after that, 401s
+        from the same generation fail fast until REAUTH_COOLDOWN has passed.
+        """
+        if not self._can_reauthenticate():
+            return False
+        with self._auth_lock:
+            if self._auth_generation != generation:
+                return True
+            if self._reauth_failed and self._reauth_failed[0] == generation \
+                    and time.monotonic() - self._reauth_failed[1] < self.REAUTH_COOLDOWN:
+                return False
+            self._auth_ready.clear()
+            try:
+                print("🔄 Credentials expired, re-authenticating...")
+                for attempt in range(self.REAUTH_ATTEMPTS):
+                    if attempt:
+                        time.sleep(self._backoff_delay(attempt - 1))
+                    ok, user = self._login_again()
+                    self._log_auth_event("REAUTH_SUCCESS" if ok else "REAUTH_FAILED", user,
+                                         f"attempt {attempt + 1}/{self.REAUTH_ATTEMPTS}")
+                    if ok:
+                        self._auth_generation += 1
+                        self._reauth_failed = None
+                        return True
+                self._reauth_failed = (generation, time.monotonic())
+                return False
+            finally:
+                self._auth_ready.set()
+    
+    def _login_again(self):
+        """One re-login with the stored credentials or token_provider(); returns (ok, user)"""
+        if self.auth_method == "session" and self._credentials:
+            return self.login_with_credentials(*self._credentials), self._credentials[0]
+        try:
+            api_key, api_secret = self.token_provider()
+        except Exception as e:
+            print(f"❌ token_provider failed: {e}")
+            return False, getattr(self, 'current_user', 'unknown')
+        self.api_key, self.api_secret = api_key, api_secret
+        self.session.headers['Authorization'] = f'token {api_key}:{api_secret}'
+        self._clear_cache()
+        return True, api_key[:8] + "..."
+    
+    def ping(self):
+        """
+        Check that the credentials still work, renewing them if not
+        A lost session makes frappe treat the caller as Guest (403 on this
+        endpoint), which also triggers re-authentication. Returns True when
+        the client is (again) authenticated.
+        """
+        generation = self._auth_generation
+        try:
+            response = self._send_request('GET', '/api/method/frappe.auth.get_logged_user')
+        except requests.exceptions.RequestException:
+            return False
+        if response.status_code == 403 and self.auth_method == "session":
+            return self._reauthenticate(generation)
+        return response.status_code == 200
+    
+    def start_session_keepalive(self, interval=300):
+        """
+        Ping every interval seconds from a daemon thread
+        Keeps the session alive and renews expired credentials between
+        requests, so long batch jobs do not stall on a re-login.
+        """
+        if self._keepalive_thread and self._keepalive_thread.is_alive():
+            return
+        self._keepalive_stop.clear()
+        
+        def run():
+            while not self._keepalive_stop.wait(interval):
+                if not self.ping():
+                    print("⚠️  Keepalive ping failed")
+        
+        self._keepalive_thread = threading.Thread(target=run, name="erpnext-keepalive", daemon=True)
+        self._keepalive_thread.start()
+    
+    def stop_session_keepalive(self):
+        """Stop the keepalive thread, if running"""
+        self._keepalive_stop.set()
+        if self._keepalive_thread:
+            self._keepalive_thread.join()
+            self._keepalive_thread = None
+    
+    def _timed_request(self, method, endpoint, stream_body=False, **kwargs):
+        """
+        Issue one HTTP request and record its phase timings in self.metrics
+        With stream_body=True the body is left unread for the caller to
+        consume incrementally (download time is then not recorded).
+        """
+        _phase_timings.connect = 0.0
+        started = time.perf_counter()
+        try:
+            kwargs.setdefault('timeout', self.timeout)
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)  # A retry or re-auth replay resends a streamed upload from the start
+            response = self.session.request(method, f"{self.base_url}{endpoint}", stream=True, **kwargs)
+            headers_at = time.perf_counter()
+            if stream_body:
+                connect = _phase_timings.connect
+                self.metrics.observe(method, endpoint, response.status_code, connect,
+                                     max(headers_at - started - connect, 0), 0.0,
+                                     int(response.headers.get('Content-Length') or 0))
+                return response
+            body = response.content  # Read the body now so download time is measurable
+        except requests.exceptions.RequestException:
+            self.metrics.observe(method, endpoint, 0, _phase_timings.connect,
+                                 max(time.perf_counter() - started - _phase_timings.connect, 0), 0.0, 0)
+            raise
+        finished = time.perf_counter()
+        connect = _phase_timings.connect
+        self.metrics.observe(method, endpoint, response.status_code, connect,
+                             max(headers_at - started - connect, 0), finished - headers_at, len(body))
+        return response
+    
+    def _handle_response(self, response):
+        """Map auth/rate-limit errors to None, raise other HTTP errors, decode JSON"""
+        # Handle authentication errors
+        if response.status_code == 401:
+            print("❌ Authentication failed. Token may be expired.")
+            return None
+        elif response.status_code == 403:
+            print("❌ Access forbidden. Check permissions.")
+            return None
+        elif response.status_code == 429:
+            print("❌ Rate limit exceeded. Please wait.")
+            return None
+        
+        try:
             response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.HTTPError as e:
             print(f"❌ Request failed: {e}")
-            self._log_request(method, endpoint, 0, str(e))
             raise
+        return response.json()
+    
+    def _retry_delay(self, response, attempt):
+        """
+        Seconds to wait before retrying: Retry-After if sent, else jittered backoff
+        The server's Retry-After is honoured as is; backoff_max only caps
+        the computed backoff.
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return max(retry_at.timestamp() - time.time(), 0)
+                except (TypeError, ValueError):
+                    pass
+        return self._backoff_delay(attempt)
+    
+    def _backoff_delay(self, attempt):
+        """Jittered exponential backoff, capped at backoff_max"""
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_base * 2 ** attempt, self.backoff_max))
     
     def _log_request(self, method, endpoint, status_code, error=""):
         """Log API requests for audit"""
         timestamp = datetime.now().isoformat()
         user = getattr(self, 'current_user', 'unknown')
-        log_entry = f"{timestamp} - {method} {endpoint} - {status_code} - User: {user} - {error}\n"
-        
-        try:
-            with open('api_requests.log', 'a') as f:
-                f.write(log_entry)
-        except:
-            pass
+        self.request_log.write({
+            'timestamp': timestamp,
+            'method': method,
+            'endpoint': endpoint,
+            'status': status_code,
+            'user': user,
+            'error': error,
+            'line': f"{timestamp} - {method} {endpoint} - {status_code} - User: {user} - {error}",
+        })
     
     # Secure API methods
     def get(self, endpoint, params=None):
         """Secure GET request"""
-        return self._make_secure_request('GET', endpoint, params=params)
+        if self.cache is None:
+            return self._make_secure_request('GET', endpoint, params=params)
+        return self._cached_get(endpoint, params)
     
     def post(self, endpoint, data=None):
         """Secure POST request"""
-        return self._make_secure_request('POST', endpoint, json=data)
+        try:
+            return self._make_secure_request('POST', endpoint, json=data)
+        finally:
+            self._invalidate_cache(endpoint)
     
     def put(self, endpoint, data=None):
         """Secure PUT request"""
-        return self._make_secure_request('PUT', endpoint, json=data)
+        try:
+            return self._make_secure_request('PUT', endpoint, json=data)
+        finally:
+            self._invalidate_cache(endpoint)
     
     def delete(self, endpoint):
         """Secure DELETE request"""
-        return self._make_secure_request('DELETE', endpoint)
+        try:
+            return self._make_secure_request('DELETE', endpoint)
+        finally:
+            self._invalidate_cache(endpoint)
+    
+    def _cached_get(self, endpoint, params):
+        """GET through the response cache, revalidating stale entries"""
+        key = self.cache.key_for(endpoint, params)
+        entry, fresh = self.cache.lookup(key)
+        if fresh:
+            return entry['data']
+        
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        response = self._send_request('GET', endpoint, params=params, headers=headers)
+        if response.status_code == 304 and entry:
+            self.cache.refresh(key, entry)
+            return entry['data']
+        
+        result = self._handle_response(response)
+        if result is not None:
+            self.cache.store(key, result, response.headers)
+        return result
+    
+    def _clear_cache(self):
+        """Drop every cached GET (cache keys do not include the credentials)"""
+        if self.cache is not None:
+            self.cache.invalidate()
+    
+    def _invalidate_cache(self, endpoint):
+        """Drop cached GETs for the DocType a write targets"""
+        if self.cache is None:
+            return
+        doctype = self.cache.doctype_for(endpoint)
+        if doctype:
+            self.cache.invalidate(doctype)
+        else:
+            # Whitelisted methods may touch anything
+            self.cache.invalidate()
+    
+    def get_meta(self, doctype):
+        """
+        DocTypeMeta for a DocType, loaded once and refreshed lazily
+        A cached entry older than the cache ttl is revalidated by sending
+        its `modified` to getdoctype, which answers "use_cache" unless the
+        DocType changed, so the full meta is only downloaded again then.
+        """
+        site = self.site or self.base_url
+        entry = self.metadata.get(site, doctype)
+        now = time.time()
+        if entry and now - entry[1] < self.metadata.ttl:
+            return entry[0]
+        
+        params = {'doctype': doctype}
+        if entry:
+            params['cached_timestamp'] = entry[0].modified
+        result = self._make_secure_request('GET', '/api/method/frappe.desk.form.load.getdoctype', params=params)
+        if result is None:
+            raise Exception(f"Could not load metadata for {doctype}")
+        if entry and result.get('message') == 'use_cache':
+            self.metadata.touch(site, doctype, now)
+            return entry[0]
+        
+        docs = result.get('docs') or []
+        if not docs:
+            raise Exception(f"No metadata returned for {doctype}")
+        meta = DocTypeMeta.from_docs(docs)
+        self.metadata.put(site, meta, now)
+        return meta
+    
+    def iter_resource(self, doctype, fields=None, filters=None, page_size=500,
+                      order_by="name asc", prefetch=False):
+        """
+        Iterate over every record of a DocType, yielding one record at a time
+        Walks limit_start/limit_page_length lazily so memory stays constant.
+        With prefetch=True the next page is fetched in the background while
+        the caller processes the current one.
+        """
+        endpoint = f"/api/resource/{quote(doctype)}"
+        params = {'limit_page_length': page_size}
+        if fields:
+            params['fields'] = json.dumps(fields)
+        if filters:
+            params['filters'] = json.dumps(filters)
+        if order_by:
+            params['order_by'] = order_by
+        
+        def fetch_page(start):
+            # Pages bypass the response cache so a long walk stays constant-memory
+            response = self._make_secure_request('GET', endpoint, params={**params, 'limit_start': start})
+            if response is None:
+                raise Exception(f"Failed to fetch {doctype} page at offset {start}")
+            return response.get('data', [])
+        
+        if not prefetch:
+            start = 0
+            while True:
+                page = fetch_page(start)
+                yield from page
+                if len(page) < page_size:
+                    return
+                start += page_size
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = 0
+            pending = executor.submit(fetch_page, start)
+            while pending is not None:
+                page = pending.result()
+                start += page_size
+                # Only request the next page when this one was full
+                pending = executor.submit(fetch_page, start) if len(page) >= page_size else None
+                yield from page
+    
+    def iter_projected(self, doctype, fields, filters=None, page_size=500,
+                       order_by="name asc", as_tuples=False):
+        """
+        Iterate over a DocType reading only the given fields
+        Rows are requested as value lists (as_dict=0) and decoded one at a
+        time with ijson when it is installed, so a page never exists as a
+        list of dicts. Yields compact record_type() instances, or plain
+        tuples in field order with as_tuples=True.
+        """
+        if not fields:
+            raise ValueError("iter_projected() needs an explicit fields list")
+        fields = list(fields)
+        make_row = tuple if as_tuples else record_type(doctype, fields)
+        endpoint = f"/api/resource/{quote(doctype)}"
+        params = {
+            'fields': json.dumps(fields),
+            'limit_page_length': page_size,
+            'as_dict': 0,
+        }
+        if filters:
+            params['filters'] = json.dumps(filters)
+        if order_by:
+            params['order_by'] = order_by
+        
+        start = 0
+        while True:
+            count = 0
+            for row in self.stream_list_rows(endpoint, {**params, 'limit_start': start}):
+                if isinstance(row, dict):
+                    # Servers that ignore as_dict still return objects
+                    row = [row.get(f) for f in fields]
+                yield make_row(row)
+                count += 1
+            if count < page_size:
+                return
+            start += page_size
+    
+    def iter_since(self, doctype, fields=None, filters=None, since=None, after_name=None,
+                   order_field="modified", page_size=1000):
+        """
+        Keyset-paginate a DocType in (order_field, name) order from a watermark
+        `since` and `after_name` are the order_field value and name of the
+        last consumed row; reading resumes at order_field = since AND
+        name > after_name, then order_field > since, so rows changing under
+        the watermark are never skipped. Yields (row, value, name) so callers
+        can persist the watermark after any row. Rows are value lists in
+        `fields` order when fields are given (they must include name and
+        order_field), even from servers that ignore as_dict=0; otherwise
+        dicts of all fields.
+        """
+        endpoint = f"/api/resource/{quote(doctype)}"
+        base_params = {
+            'order_by': f"{order_field} asc, name asc",
+            'limit_page_length': page_size,
+            'fields': json.dumps(list(fields) if fields else ["*"]),
+            'as_dict': 0 if fields else 1,
+        }
+        value_at = name_at = None
+        if fields:
+            value_at, name_at = list(fields).index(order_field), list(fields).index("name")
+        
+        def page(keyset):
+            nonlocal since, after_name
+            params = dict(base_params)
+            page_filters = list(filters or []) + keyset
+            if page_filters:
+                params['filters'] = json.dumps(page_filters)
+            count = 0
+            for row in self.stream_list_rows(endpoint, params):
+                count += 1
+                if fields and isinstance(row, dict):
+                    row = [row.get(f) for f in fields]
+                if isinstance(row, dict):
+                    since, after_name = row.get(order_field), row.get("name")
+                else:
+                    since, after_name = row[value_at], row[name_at]
+                yield row, since, after_name
+            return count
+        
+        while True:
+            if since is None:
+                count = yield from page([])
+            else:
+                if after_name is not None:
+                    # Rest of the rows sharing the watermark value, by name
+                    count = yield from page([[order_field, "=", since], ["name", ">", after_name]])
+                    if count >= page_size:
+                        continue
+                # Without a name (older watermarks) re-read the tied rows rather than skip any
+                count = yield from page([[order_field, ">" if after_name is not None else ">=", since]])
+            if count < page_size:
+                return
+    
+    def stream_list_rows(self, endpoint, params):
+        """Yield the rows of a list response's "data" array as they are decoded"""
+        response = self._send_request('GET', endpoint, params=params, stream_body=True)
+        try:
+            if response.status_code != 200:
+                if self._handle_response(response) is None:
+                    raise Exception(f"Failed to fetch {endpoint} at offset {params.get('limit_start')}")
+            ijson = _load_ijson()
+            if ijson is None:
+                yield from response.json().get('data', [])
+                return
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, 'data.item', use_float=True)
+        finally:
+            response.close()
+    
+    def get_many(self, doctype, names, fields=None, child_tables=None, batch_size=100, workers=4):
+        """
+        Fetch many documents by name with batched list queries
+        Names are split into ["name", "in", [...]] filters that run
+        concurrently; the result is aligned with `names` (None where a
+        document was not found). child_tables maps a table fieldname to its
+        child DocType, e.g. {"items": "Sales Invoice Item"}; those rows are
+        fetched in bulk by parent and attached to each document in idx order.
+        """
+        names = list(names)
+        unique = list(dict.fromkeys(names))
+        batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        fields = list(fields) if fields else ["*"]
+        if "name" not in fields and fields != ["*"]:
+            fields.append("name")
+        
+        def fetch_parents(batch):
+            return self._list_all(doctype, fields, [["name", "in", batch]])
+        
+        def fetch_children(batch, fieldname, child_doctype):
+            return fieldname, self._list_all(
+                child_doctype, ["*"],
+                [["parent", "in", batch], ["parenttype", "=", doctype], ["parentfield", "=", fieldname]],
+                order_by="parent asc, idx asc", parent=doctype,
+            )
+        
+        documents = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for rows in executor.map(fetch_parents, batches):
+                for row in rows:
+                    documents[row['name']] = row
+            
+            if child_tables and documents:
+                found = [name for name in unique if name in documents]
+                for doc in documents.values():
+                    for fieldname in child_tables:
+                        doc[fieldname] = []
+                jobs = [
+                    executor.submit(fetch_children, found[i:i + batch_size], fieldname, child_doctype)
+                    for fieldname, child_doctype in child_tables.items()
+                    for i in range(0, len(found), batch_size)
+                ]
+                for job in jobs:
+                    fieldname, rows = job.result()
+                    for row in rows:
+                        parent = documents.get(row.get('parent'))
+                        if parent is not None:
+                            parent[fieldname].append(row)
+        
+        return [documents.get(name) for name in names]
+    
+    def _list_all(self, doctype, fields, filters, order_by="name asc", page_size=500, parent=None):
+        """Fetch every row of a filtered list query, following pagination"""
+        endpoint = f"/api/resource/{quote(doctype)}"
+        params = {
+            'fields': json.dumps(fields),
+            'filters': json.dumps(filters),
+            'order_by': order_by,
+            'limit_page_length': page_size,
+        }
+        if parent:
+            # Child DocTypes are permission-checked through their parent
+            params['parent'] = parent
+        rows = []
+        start = 0
+        while True:
+            # Uncached like iter_resource: pages are read once
+            response = self._make_secure_request('GET', endpoint, params={**params, 'limit_start': start})
+            if response is None:
+                raise Exception(f"Failed to fetch {doctype} rows at offset {start}")
+            page = response.get('data', [])
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+    
+    def run_report(self, report_name, filters=None, chunk_size=1000, background="auto",
+                   timeout=None, poll_interval=2, max_wait=3600):
+        """
+        Run a query report and return a ReportResult that streams its rows
+        background="auto" runs the report directly and falls back to a
+        Prepared Report (a background job on the server) when the request
+        times out, the gateway gives up (502/504) or the report is set up as
+        prepared; True always queues it, False never does. timeout is the
+        read timeout of the direct run. Rows are decoded incrementally and
+        yielded in chunks of chunk_size.
+        """
+        result = ReportResult(report_name)
+        result._chunks = self._report_chunks(result, json.dumps(filters or {}), chunk_size, background,
+                                             timeout, poll_interval, max_wait)
+        return result
+    
+    def _report_chunks(self, result, filters, chunk_size, background, timeout, poll_interval, max_wait):
+        """Generator behind ReportResult: direct run, then prepared report if needed"""
+        prepared = None
+        if background is not True:
+            status = {}
+            yield from self._chunked(self._run_report_direct(result, filters, timeout, background, status),
+                                     chunk_size)
+            if status.get('done'):
+                return
+            prepared = status.get('doc')
+        
+        if prepared is None:
+            prepared = self.queue_prepared_report(result.report_name, filters)
+        
+        result.prepared_report = prepared
+        doc = self._wait_for_prepared_report(prepared, poll_interval, max_wait)
+        if doc.get('columns'):
+            # v12-v14 keep the columns on the doc and only the rows in the file
+            result.columns = json.loads(doc['columns']) if isinstance(doc['columns'], str) else doc['columns']
+        yield from self._chunked(self._prepared_report_rows(result, prepared), chunk_size)
+    
+    def queue_prepared_report(self, report_name, filters=None):
+        """
+        Queue a report as a Prepared Report and return the doc's name
+        frappe v12-v14 queue it through query_report.background_enqueue_run
+        (inserting the doc alone never runs it); where that method is gone
+        (v15+) inserting a Prepared Report enqueues it. filters is a dict
+        or its JSON string.
+        """
+        filters = filters if isinstance(filters, str) else json.dumps(filters or {})
+        try:
+            queued = self._make_secure_request(
+                'POST', '/api/method/frappe.desk.query_report.background_enqueue_run',
+                json={'report_name': report_name, 'filters': filters},
+            )
+            if queued is not None:
+                return queued['message']['name']
+        except requests.exceptions.HTTPError:
+            created = self.post('/api/resource/Prepared Report', {
+                'report_name': report_name,
+                'ref_report_doctype': report_name,
+                'filters': filters,
+            })
+            if created is not None:
+                return created['data']['name']
+        raise Exception(f"Could not queue report {report_name}")
+    
+    def _run_report_direct(self, result, filters, timeout, background, status):
+        """
+        Yield rows of a synchronous frappe.desk.query_report.run call
+        Sets status['done'] when the rows are complete, or status['doc'] to
+        the Prepared Report the server queued instead.
+        """
+        endpoint = '/api/method/frappe.desk.query_report.run'
+        params = {'report_name': result.report_name, 'filters': filters}
+        kwargs = {'timeout': (self.timeout[0], timeout)} if timeout else {}
+        try:
+            response = self._send_request('GET', endpoint, params=params, stream_body=True, **kwargs)
+        except requests.exceptions.Timeout:
+            if background is False:
+                raise
+            print(f"⏳ {result.report_name} timed out, running it as a prepared report...")
+            return
+        
+        try:
+            if response.status_code in (502, 504) and background is not False:
+                print(f"⏳ {result.report_name} timed out ({response.status_code}), "
+                      f"running it as a prepared report...")
+                return
+            if response.status_code != 200 and self._handle_response(response) is None:
+                raise Exception(f"Report {result.report_name} was rejected")
+            response.raw.decode_content = True
+            yield from self._iter_report_rows(response.raw, 'message', result, status)
+        finally:
+            response.close()
+        
+        # A prepared report answers with its latest completed result, if any
+        if not status.get('prepared_report') or status.get('doc_status') == 'Completed':
+            status['done'] = True
+        elif background is False:
+            raise Exception(f"Report {result.report_name} is a prepared report; use background='auto'")
+    
+    def _wait_for_prepared_report(self, name, poll_interval, max_wait):
+        """Poll a Prepared Report until its background job finishes; returns the doc"""
+        endpoint = f"/api/resource/Prepared Report/{quote(name)}"
+        deadline = time.monotonic() + max_wait
+        delay = poll_interval
+        while True:
+            # Bypass the response cache: the status is what changes
+            doc = (self._make_secure_request('GET', endpoint) or {}).get('data', {})
+            state = doc.get('status')
+            if state == 'Completed':
+                return doc
+            if state in ('Error', 'Failed'):
+                raise Exception(f"Prepared report {name} failed: {doc.get('error_message', '')}")
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Prepared report {name} still {state} after {max_wait}s")
+            time.sleep(delay)
+            delay = min(delay * 1.5, 30)
+    
+    def _prepared_report_rows(self, result, name):
+        """Yield rows from the gzipped JSON file attached to a completed Prepared Report"""
+        files = self._list_all('File', ['file_url'], [
+            ['attached_to_doctype', '=', 'Prepared Report'],
+            ['attached_to_name', '=', name],
+        ])
+        if not files:
+            raise Exception(f"Prepared report {name} has no result file")
+        file_url = files[0]['file_url']
+        
+        response = self._send_request('GET', quote(file_url), stream_body=True)
+        try:
+            if response.status_code != 200 and self._handle_response(response) is None:
+                raise Exception(f"Could not download {file_url}")
+            response.raw.decode_content = True
+            stream = gzip.GzipFile(fileobj=response.raw) if file_url.endswith('.gz') else response.raw
+            yield from self._iter_report_rows(stream, '', result, {})
+        finally:
+            response.close()
+    
+    def _iter_report_rows(self, stream, base, result, status):
+        """
+        Decode report rows from a JSON stream, one row at a time
+        Rows are read from <base>.result and result.columns from
+        <base>.columns in whichever order they arrive; prepared_report and
+        doc name/status are copied into status. A prepared report file
+        (base '') may also be a bare list of rows, as v12-v14 write it.
+        """
+        def path(key):
+            return f"{base}.{key}" if base else key
+        
+        rows_paths, columns_path = {path('result.item')} | ({'item'} if not base else set()), path('columns')
+        scalars = {path('prepared_report'): 'prepared_report', path('doc.name'): 'doc',
+                   path('doc.status'): 'doc_status'}
+        
+        ijson = _load_ijson()
+        if ijson is None:
+            data = json.load(stream)
+            if isinstance(data, list):
+                data = {'result': data}
+            data = data.get(base, {}) if base else data
+            result.columns = data.get('columns') or result.columns
+            doc = data.get('doc') or {}
+            status.update(prepared_report=data.get('prepared_report'), doc=doc.get('name'),
+                          doc_status=doc.get('status'))
+            for row in data.get('result') or []:
+                result.rows += 1
+                yield row
+            return
+        
+        builder, building, depth = None, None, 0
+        for prefix, event, value in ijson.parse(stream, use_float=True):
+            if builder is None:
+                if prefix in scalars:
+                    status[scalars[prefix]] = value
+                if event not in ('start_map', 'start_array') or (prefix not in rows_paths and prefix != columns_path):
+                    continue
+                builder, building, depth = ijson.ObjectBuilder(), prefix, 0
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            if depth:
+                continue
+            if building == columns_path:
+                result.columns = builder.value
+            else:
+                result.rows += 1
+                yield builder.value
+            builder = None
+    
+    @staticmethod
+    def _chunked(rows, chunk_size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def bulk_upsert(self, doctype, records, workers=4, max_in_flight=None,
+                    batch_size=50, max_retries=3, use_insert_many=True, validate=False):
+        """
+        Create or update many documents of a DocType in parallel
+        Records with a 'name' are updated (PUT, falling back to POST when the
+        document does not exist); records without one are inserted. Inserts
+        go through frappe.client.insert_many in batches when the server
+        allows it, otherwise one POST per record. Failed records are retried
+        individually, except batch inserts whose outcome is unknown (timeout,
+        gateway error): those fail rather than risk duplicates. With validate=True records are first checked against
+        the DocType meta (get_meta) and invalid ones fail without a request.
+        Returns a BulkUpsertReport.
+        """
+        report = BulkUpsertReport()
+        started = time.monotonic()
+        meta = self.get_meta(doctype) if validate else None
+        
+        def chunks():
+            batch = []
+            for index, record in enumerate(records):
+                problems = meta.validate(record, insert=not record.get('name')) if meta else None
+                if problems:
+                    report.failed.append((index, "; ".join(problems)))
+                    continue
+                batch.append((index, record))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        
+        _run_bounded(
+            lambda batch: self._upsert_batch(doctype, batch, max_retries, use_insert_many, report),
+            chunks(), workers, max_in_flight,
+        )
+        return report.finish(started)
+    
+    def _upsert_batch(self, doctype, batch, max_retries, use_insert_many, report):
+        """Process one batch of (index, record) pairs for bulk_upsert()"""
+        inserts = [(i, r) for i, r in batch if not r.get('name')]
+        updates = [(i, r) for i, r in batch if r.get('name')]
+        
+        if inserts and use_insert_many and getattr(self, '_insert_many_available', True):
+            if self._insert_many(doctype, inserts, report):
+                inserts = []
+        
+        for index, record in inserts + updates:
+            self._upsert_one(doctype, index, record, max_retries, report)
+    
+    def _insert_many(self, doctype, items, report):
+        """
+        Try a server-side batch insert; returns False to fall back to per-record
+        Only answers that prove nothing was committed fall back: frappe
+        rolls the whole batch back on an error response, but after a
+        timeout or a gateway error the batch may have been saved, so
+        replaying it could create duplicates.
+        """
+        docs = [{'doctype': doctype, **record} for _, record in items]
+        started = time.monotonic()
+        try:
+            result = self.post('/api/method/frappe.client.insert_many', {'docs': json.dumps(docs)})
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            # Method missing or not whitelisted: stop trying it for this client
+            if status in (404, 405):
+                self._insert_many_available = False
+            if status is not None and status < 501:
+                return False
+            error = str(e)
+        except ReauthenticationError:
+            return False  # Rejected before it ran
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+        else:
+            if result is None:
+                return False  # 401/403/429: rejected before it ran
+            names = result.get('message')
+            if isinstance(names, list) and len(names) == len(items):
+                # insert_many collects names in a set, so only a single insert maps back to its index
+                for index, _ in items:
+                    report.succeeded.append((index, names[0] if len(items) == 1 else None))
+                return True
+            error = f"unexpected insert_many response: {str(result)[:200]}"
+        finally:
+            report.timings.append(time.monotonic() - started)
+        
+        for index, _ in items:
+            report.failed.append((index, f"insert_many outcome unknown, not retried to avoid duplicates: {error}"))
+        return True
+    
+    def _upsert_one(self, doctype, index, record, max_retries, report):
+        """Create or update a single record with retries"""
+        resource = f"/api/resource/{quote(doctype)}"
+        error = ""
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 10))
+            started = time.monotonic()
+            try:
+                result = None
+                if record.get('name'):
+                    try:
+                        result = self.put(f"{resource}/{quote(str(record['name']))}", record)
+                    except requests.exceptions.HTTPError as e:
+                        if e.response is None or e.response.status_code != 404:
+                            raise
+                        result = self.post(resource, record)
+                else:
+                    result = self.post(resource, record)
+                
+                if result is not None:
+                    data = result.get('data', {})
+                    report.succeeded.append((index, data.get('name', record.get('name'))))
+                    return True
+                error = "Request rejected (401/403/429)"
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                # Client errors other than conflicts will not succeed on retry
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status is not None and 400 <= status < 500 and status not in (409, 429):
+                    break
+            finally:
+                report.timings.append(time.monotonic() - started)
+        
+        report.failed.append((index, error))
+        return False
+    
+    def upload_file(self, path, doctype=None, docname=None, fieldname=None, is_private=True,
+                    folder="Home", file_name=None):
+        """
+        Upload a file through /api/method/upload_file, streamed from disk
+        Pass doctype/docname (and fieldname for an Attach field) to attach
+        it to a document. Returns the created File document.
+        """
+        body = MultipartFileBody(path, {
+            'is_private': int(bool(is_private)),
+            'folder': folder,
+            'doctype': doctype,
+            'docname': docname,
+            'fieldname': fieldname,
+        }, file_name=file_name)
+        try:
+            result = self._make_secure_request('POST', '/api/method/upload_file', data=body,
+                                               headers={'Content-Type': body.content_type})
+        finally:
+            body.close()
+        if result is None:
+            raise Exception(f"Upload of {path} was rejected")
+        return result.get('message')
+    
+    def download_file(self, file_url, path, chunk_size=1 << 20):
+        """
+        Download a File's content straight to disk
+        file_url is the File's file_url (/files/... or /private/files/...)
+        and path a file or directory. The body is written with iter_content
+        to <path>.part and renamed once complete. Returns (path, bytes).
+        """
+        if not file_url.startswith('/'):
+            raise ValueError(f"Expected a site file URL such as /files/name, got '{file_url}'")
+        if os.path.isdir(path):
+            path = os.path.join(path, os.path.basename(file_url))
+        partial = f"{path}.part"
+        
+        response = self._send_request('GET', quote(file_url), stream_body=True)
+        try:
+            if response.status_code != 200 and self._handle_response(response) is None:
+                raise Exception(f"Could not download {file_url}")
+            size = 0
+            with open(partial, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(partial, path)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        finally:
+            response.close()
+        return path, size
+    
+    def upload_files(self, items, workers=4, max_in_flight=None, **options):
+        """
+        Upload many files in parallel
+        items yields paths or dicts of upload_file() arguments (with 'path');
+        options are defaults for every item. Returns a FileTransferReport
+        listing the new file URLs. Keep pool_maxsize >= workers.
+        """
+        def upload(item):
+            kwargs = {**options, **item} if isinstance(item, dict) else {**options, 'path': item}
+            doc = self.upload_file(**kwargs)
+            return doc.get('file_url'), os.path.getsize(kwargs['path'])
+        
+        return self._transfer_many(items, upload, workers, max_in_flight)
+    
+    def download_files(self, items, dest_dir, workers=4, max_in_flight=None, chunk_size=1 << 20):
+        """
+        Download many files in parallel
+        items yields file URLs, saved under dest_dir by name, or
+        (file_url, path) pairs. URLs sharing a name (/files/a.pdf and
+        /private/files/a.pdf) get a numbered suffix (a-1.pdf); a path given
+        twice fails for the later item. Returns a FileTransferReport listing
+        the local paths. Keep pool_maxsize >= workers.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        
+        def destinations():
+            # Resolved in submission order, so no two downloads write the same file
+            claimed = set()
+            for item in items:
+                file_url, path = item if isinstance(item, (tuple, list)) else (item, dest_dir)
+                named = os.path.isdir(path)
+                if named:
+                    path = os.path.join(path, os.path.basename(file_url))
+                root, ext = os.path.splitext(os.path.abspath(path))
+                path, suffix = f"{root}{ext}", 0
+                while named and path in claimed:
+                    suffix += 1
+                    path = f"{root}-{suffix}{ext}"
+                if path in claimed:
+                    yield file_url, ValueError(f"{path} is already the destination of another download")
+                    continue
+                claimed.add(path)
+                yield file_url, path
+        
+        def download(item):
+            file_url, path = item
+            if isinstance(path, Exception):
+                raise path
+            return self.download_file(file_url, path, chunk_size)
+        
+        return self._transfer_many(destinations(), download, workers, max_in_flight)
+    
+    def _transfer_many(self, items, transfer, workers, max_in_flight):
+        """Run transfer(item) -> (result, bytes) over items with _run_bounded()"""
+        report = FileTransferReport()
+        started = time.monotonic()
+        
+        def run(indexed):
+            index, item = indexed
+            try:
+                result, size = transfer(item)
+                report.add(index, result, size)
+            except Exception as e:
+                report.failed.append((index, str(e)))
+        
+        _run_bounded(run, enumerate(items), workers, max_in_flight)
+        return report.finish(started)
     
     def logout(self):
         """Logout and clear session"""
+        self.stop_session_keepalive()
+        self._credentials = None
         if self.auth_method == "session":
             try:
-                self.session.post(f"{self.base_url}/api/method/logout")
+                self.session.post(f"{self.base_url}/api/method/logout", timeout=self.timeout)
                 print("✅ Logged out successfully")
             except:
                 pass
         
         self.session.cookies.clear()
+        self.session.headers.pop('Authorization', None)
         self.auth_method = None
+        self._clear_cache()
         print("🔒 Session cleared")
 
 def demo_secure_usage():
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+ERPNext Incremental Sync
+Keeps a per-DocType high-water mark on (modified, name), fetches only rows
+changed since the last run, detects deletions through Deleted Document and
+emits a change stream to a SQLite database or a JSON-lines file.
+
+Examples:
+  python3 sync_api_data.py --sink sqlite:erpnext_changes.db "Sales Invoice" Customer
+  python3 sync_api_data.py --sink jsonl:changes.jsonl --interval 300 "GL Entry"
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import time
+from datetime import datetime
+
+from secure_api_client import ERPNextSecureClient
+
+EMPTY_STATE = {"modified": None, "name": None, "deleted_creation": None, "deleted_name": None}
+
+class SQLiteSink:
+    """
+    Change stream and current snapshot in one SQLite file
+    Events, document rows and watermarks are committed in the same
+    transaction, so a crash never advances a watermark past unsaved changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                doctype TEXT NOT NULL,
+                name TEXT NOT NULL,
+                op TEXT NOT NULL,
+                modified TEXT,
+                data TEXT,
+                synced_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                doctype TEXT NOT NULL,
+                name TEXT NOT NULL,
+                modified TEXT,
+                data TEXT,
+                PRIMARY KEY (doctype, name)
+            );
+            CREATE TABLE IF NOT EXISTS watermarks (
+                doctype TEXT PRIMARY KEY,
+                state TEXT NOT NULL
+            );
+        """)
+
+    def get_state(self, doctype):
+        row = self.db.execute("SELECT state FROM watermarks WHERE doctype = ?", (doctype,)).fetchone()
+        return {**EMPTY_STATE, **json.loads(row[0])} if row else dict(EMPTY_STATE)
+
+    def write(self, doctype, events, state):
+        synced_at = datetime.now().isoformat()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO changes (doctype, name, op, modified, data, synced_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(doctype, e["name"], e["op"], e["modified"], json.dumps(e["data"], default=str), synced_at)
+                 for e in events]
+            )
+            for e in events:
+                if e["op"] == "delete":
+                    self.db.execute("DELETE FROM documents WHERE doctype = ? AND name = ?", (doctype, e["name"]))
+                else:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO documents (doctype, name, modified, data) VALUES (?, ?, ?, ?)",
+                        (doctype, e["name"], e["modified"], json.dumps(e["data"], default=str))
+                    )
+            self.db.execute("INSERT OR REPLACE INTO watermarks (doctype, state) VALUES (?, ?)",
+                            (doctype, json.dumps(state)))
+
+    def close(self):
+        self.db.close()
+
+class JsonLinesSink:
+    """
+    Append-only JSON-lines change stream
+    Watermarks live in <path>.state.json and are saved after the events are
+    flushed, so delivery is at-least-once: consumers should treat events as
+    idempotent upserts/deletes keyed by (doctype, name).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state_path = f"{path}.state.json"
+        try:
+            with open(self.state_path) as f:
+                self.states = json.load(f)
+        except (OSError, ValueError):
+            self.states = {}
+        self.file = open(path, "a")
+
+    def get_state(self, doctype):
+        return {**EMPTY_STATE, **self.states.get(doctype, {})}
+
+    def write(self, doctype, events, state):
+        synced_at = datetime.now().isoformat()
+        self.file.write("".join(
+            json.dumps({"doctype": doctype, "synced_at": synced_at, **e}, default=str) + "\n" for e in events
+        ))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.states[doctype] = state
+        with open(f"{self.state_path}.tmp", "w") as f:
+            json.dump(self.states, f, indent=2)
+        os.replace(f"{self.state_path}.tmp", self.state_path)
+
+    def close(self):
+        self.file.close()
+
+def open_sink(spec):
+    """Open a sink from "sqlite:<path>" or "jsonl:<path>\""""
+    kind, _, path = spec.partition(":")
+    if kind == "sqlite" and path:
+        return SQLiteSink(path)
+    if kind == "jsonl" and path:
+        return JsonLinesSink(path)
+    raise ValueError(f"Unknown sink '{spec}' (use sqlite:<path> or jsonl:<path>)")
+
+class SyncEngine:
+    """
+    Pull changes for DocTypes into a sink
+    Each sync_doctype() call first streams Deleted Document entries created
+    since the last run, then rows modified since the stored watermark,
+    writing events and the advanced watermark in batches.
+    """
+
+    def __init__(self, client, sink, page_size=1000, batch_size=500):
+        self.client = client
+        self.sink = sink
+        self.page_size = page_size
+        self.batch_size = batch_size
+
+    def sync_doctype(self, doctype, fields=None, filters=None):
+        """Sync one DocType; returns {"upserts": n, "deletes": n}"""
+        if fields:
+            fields = list(fields) + [f for f in ("name", "modified") if f not in fields]
+        state = self.sink.get_state(doctype)
+        stats = {"upserts": 0, "deletes": 0}
+        events = []
+
+        def flush():
+            if events:
+                self.sink.write(doctype, events, dict(state))
+                events.clear()
+
+        # Deletions first: a document deleted and recreated under the same
+        # name since the last run must end up present
+        deleted = self.client.iter_since(
+            "Deleted Document", ["name", "deleted_name", "creation"],
+            [["deleted_doctype", "=", doctype]],
+            since=state["deleted_creation"], after_name=state["deleted_name"],
+            order_field="creation", page_size=self.page_size,
+        )
+        for (_, deleted_name, creation), creation_mark, name in deleted:
+            events.append({"op": "delete", "name": deleted_name, "modified": creation, "data": None})
+            state.update(deleted_creation=creation_mark, deleted_name=name)
+            stats["deletes"] += 1
+            if len(events) >= self.batch_size:
+                flush()
+        flush()
+
+        # Changed rows
+        rows = self.client.iter_since(doctype, fields, filters, since=state["modified"],
+                                      after_name=state["name"], page_size=self.page_size)
+        for row, modified, name in rows:
+            data = dict(zip(fields, row)) if fields else row
+            events.append({"op": "upsert", "name": name, "modified": modified, "data": data})
+            state.update(modified=modified, name=name)
+            stats["upserts"] += 1
+            if len(events) >= self.batch_size:
+                flush()
+        flush()
+
+        return stats
+
+    def sync(self, doctypes, fields=None):
+        """Sync several DocTypes in turn; returns per-DocType stats"""
+        results = {}
+        for doctype in doctypes:
+            started = time.monotonic()
+            results[doctype] = self.sync_doctype(doctype, fields)
+            elapsed = time.monotonic() - started
+            print(f"   🔄 {doctype}: {results[doctype]['upserts']} changed, "
+                  f"{results[doctype]['deletes']} deleted ({elapsed:.1f}s)")
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally sync ERPNext DocTypes to a local change stream")
+    parser.add_argument("doctypes", nargs="+", help="DocTypes to sync")
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    parser.add_argument("--sink", default="sqlite:erpnext_changes.db", help="sqlite:<path> or jsonl:<path>")
+    parser.add_argument("--fields", help="comma-separated fields to sync (default: all)")
+    parser.add_argument("--page-size", type=int, default=1000, help="rows per API request")
+    parser.add_argument("--interval", type=float, help="keep running, syncing every N seconds")
+    args = parser.parse_args()
+
+    client = ERPNextSecureClient(args.url)
+    if not client.authenticate_with_token():
+        sys.exit(1)
+
+    sink = open_sink(args.sink)
+    engine = SyncEngine(client, sink, page_size=args.page_size)
+    fields = args.fields.split(",") if args.fields else None
+    try:
+        while True:
+            print(f"\n⏱️  Sync started {datetime.now().isoformat(timespec='seconds')}")
+            engine.sync(args.doctypes, fields)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    finally:
+        sink.close()
+        client.logout()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")
@@ -0,0 +1,43 @@
+"""
+Shared fixtures: an in-process mock_erpnext_server and clients logged in to it
+Run from the repository root with: python3 -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_erpnext_server import (MOCK_API_KEY, MOCK_API_SECRET, MOCK_PASSWORD, MOCK_USERNAME,
+                                 MockConfig, MockERPNextServer)
+from secure_api_client import ERPNextSecureClient
+
+@pytest.fixture
+def server():
+    with MockERPNextServer(MockConfig(doctypes=5, records=250)) as server:
+        yield server
+
+@pytest.fixture
+def make_client(server):
+    """Build non-interactive clients for the mock; all are logged out afterwards"""
+    clients = []
+
+    def make(auth="token", **options):
+        options = {'interactive': False, 'backoff_base': 0.01, **options}
+        client = ERPNextSecureClient(server.url, **options)
+        if auth == "token":
+            assert client.authenticate_with_token(MOCK_API_KEY, MOCK_API_SECRET)
+        elif auth == "session":
+            assert client.login_with_credentials(MOCK_USERNAME, MOCK_PASSWORD)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.logout()
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
@@ -0,0 +1,157 @@
+"""ERPNextSecureClient against the mock server: pagination, re-auth, caching, bulk writes, files"""
+
+import threading
+
+import pytest
+
+from mock_erpnext_server import MOCK_API_KEY, MOCK_API_SECRET, MockERPNextServer
+from secure_api_client import ReauthenticationError, ResponseCache
+
+# Pagination
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_resource_reads_every_record_once(client, prefetch):
+    names = [row['name'] for row in client.iter_resource("Customer", fields=["name"], page_size=40,
+                                                         prefetch=prefetch)]
+    assert len(names) == 250
+    assert len(set(names)) == 250
+
+def test_iter_projected_returns_field_tuples(client):
+    rows = list(client.iter_projected("Customer", ["name", "qty"], page_size=100, as_tuples=True))
+    assert len(rows) == 250
+    assert all(isinstance(row, tuple) and len(row) == 2 for row in rows)
+
+def test_iter_since_resumes_after_tied_watermark(client):
+    # Mock timestamps repeat in groups of three, so the watermark falls inside ties
+    rows = list(client.iter_since("Customer", ["name", "modified"], page_size=7))
+    keys = [(modified, name) for _, modified, name in rows]
+    assert len(keys) == 250 and keys == sorted(set(keys))
+    _, since, after_name = rows[100]
+    resumed = [name for _, _, name in client.iter_since("Customer", ["name", "modified"], since=since,
+                                                        after_name=after_name, page_size=7)]
+    assert resumed == [name for _, _, name in rows[101:]]
+
+def test_iter_since_normalises_rows_when_as_dict_is_ignored(server, client):
+    server.config.ignore_as_dict = True
+    rows = list(client.iter_since("Customer", ["name", "modified", "qty"], page_size=50))
+    assert len(rows) == 250
+    assert all(isinstance(row, list) and row[0] == name for row, _, name in rows)
+
+def test_paginated_reads_bypass_the_cache(make_client):
+    client = make_client(cache=ResponseCache())
+    assert sum(1 for _ in client.iter_resource("Customer", page_size=50)) == 250
+    assert len(client.get_many("Customer", ["C-000001", "C-000002"])) == 2
+    assert client.cache.stats()['entries'] == 0
+
+# Authentication and re-authentication
+
+def test_logout_clears_the_cache_and_a_bad_token_is_rejected(make_client):
+    client = make_client(cache=ResponseCache())
+    assert client.get('/api/resource/Customer') is not None
+    client.logout()
+    assert client.cache.stats()['entries'] == 0
+    assert not client.authenticate_with_token("wrong", "creds")
+
+def test_expired_session_is_renewed_once_for_all_threads(server, make_client):
+    client = make_client(auth="session")
+    server.expire_sessions()
+    results = []
+
+    def fetch():
+        results.append(client.get('/api/resource/Customer', params={'limit_page_length': 5}))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result and len(result['data']) == 5 for result in results)
+    assert client._auth_generation == 1
+    assert len(server.sessions) == 1
+
+def test_reauth_survives_a_transient_login_failure(server, make_client):
+    client = make_client(auth="session")
+    server.expire_sessions()
+    server.fail_next("/api/method/login", 503)
+    assert [client.get('/api/resource/Customer') is not None for _ in range(3)] == [True] * 3
+
+def test_failed_reauth_raises_and_recovers_after_cooldown(server, make_client):
+    client = make_client(auth="session", max_retries=0)
+    server.expire_sessions()
+    server.fail_next("/api/method/login", 503, count=client.REAUTH_ATTEMPTS)
+    with pytest.raises(ReauthenticationError):
+        client.get('/api/resource/Customer')
+    with pytest.raises(ReauthenticationError):
+        client.get('/api/resource/Customer')  # Within the cooldown: fails fast
+    generation, failed_at = client._reauth_failed
+    client._reauth_failed = (generation, failed_at - client.REAUTH_COOLDOWN)
+    assert client.get('/api/resource/Customer') is not None
+
+def test_token_provider_renews_rejected_token(make_client):
+    client = make_client(token_provider=lambda: (MOCK_API_KEY, MOCK_API_SECRET))
+    client.session.headers['Authorization'] = "token stale:token"
+    assert client.get('/api/resource/Customer') is not None
+
+# Retries
+
+def test_retry_after_is_not_capped_by_backoff_max(client):
+    class Response:
+        headers = {'Retry-After': "90"}
+
+    client.backoff_max = 30
+    assert client._retry_delay(Response(), 0) == 90
+    Response.headers = {}
+    assert client._retry_delay(Response(), 10) <= 30
+
+# Bulk upsert
+
+def test_bulk_upsert_inserts_and_updates(server, client):
+    customers = server.dataset.table("Customer")
+    records = [{'title': f"New {i}"} for i in range(30)] + [{'name': "C-000003", 'title': "Renamed"}]
+    report = client.bulk_upsert("Customer", records, batch_size=8, workers=3)
+    assert report.summary()['succeeded'] == 31
+    assert report.failed == []
+    assert [index for index, _ in report.succeeded] == list(range(31))
+    assert len(customers) == 280
+    assert customers["C-000003"]['title'] == "Renamed"
+
+def test_bulk_upsert_falls_back_after_a_rolled_back_batch(server, client):
+    server.fail_next("/api/method/frappe.client.insert_many", 417)
+    report = client.bulk_upsert("Customer", [{'title': f"New {i}"} for i in range(5)], batch_size=5)
+    assert report.summary()['succeeded'] == 5
+    assert len(server.dataset.table("Customer")) == 255
+
+def test_bulk_upsert_does_not_replay_an_ambiguous_batch(server, make_client):
+    client = make_client(read_timeout=0.2)
+    server.config.latency_ms = 500
+    report = client.bulk_upsert("Customer", [{'title': f"New {i}"} for i in range(4)], batch_size=4,
+                                max_retries=0)
+    server.config.latency_ms = 0
+    assert report.succeeded == []
+    assert len(report.failed) == 4 and "outcome unknown" in report.failed[0][1]
+
+# Files
+
+def test_downloads_with_the_same_name_do_not_collide(tmp_path, client):
+    sources = []
+    for folder, size, private in (("a", 300000, False), ("b", 200000, True)):
+        path = tmp_path / folder / "report.pdf"
+        path.parent.mkdir()
+        path.write_bytes(bytes([size % 251]) * size)
+        sources.append({'path': str(path), 'is_private': private})
+    uploaded = client.upload_files(sources)
+    urls = [url for _, url in uploaded.succeeded]
+    assert len(set(urls)) == 2
+
+    report = client.download_files(urls, str(tmp_path / "out"))
+    assert report.failed == []
+    paths = [path for _, path in report.succeeded]
+    assert len(set(paths)) == 2
+    assert sorted(open(p, 'rb').read() for p in paths) == sorted(open(s['path'], 'rb').read() for s in sources)
+
+def test_mock_server_standalone_fault_injection():
+    with MockERPNextServer() as server:
+        server.fail_next("/api/method/ping", 502, count=2)
+        assert server.take_failure("/api/method/ping") == 502
+        assert server.take_failure("/api/method/ping") == 502
+        assert server.take_failure("/api/method/ping") is None
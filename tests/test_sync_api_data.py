@@ -0,0 +1,52 @@
+"""SyncEngine against the mock server: watermarks, updates and deletions"""
+
+import json
+
+import pytest
+
+from sync_api_data import JsonLinesSink, SQLiteSink, SyncEngine
+
+FIELDS = ["name", "modified", "title"]
+
+@pytest.fixture(params=["sqlite", "jsonl"])
+def sink(request, tmp_path):
+    sink = SQLiteSink(str(tmp_path / "changes.db")) if request.param == "sqlite" \
+        else JsonLinesSink(str(tmp_path / "changes.jsonl"))
+    yield sink
+    sink.close()
+
+def test_second_sync_only_emits_changes(client, sink):
+    engine = SyncEngine(client, sink, page_size=40, batch_size=25)
+    assert engine.sync_doctype("Customer", FIELDS) == {"upserts": 250, "deletes": 0}
+    assert engine.sync_doctype("Customer", FIELDS) == {"upserts": 0, "deletes": 0}
+
+    client.put("/api/resource/Customer/C-000010", {"title": "Changed"})
+    client.delete("/api/resource/Customer/C-000020")
+    assert engine.sync_doctype("Customer", FIELDS) == {"upserts": 1, "deletes": 1}
+
+def test_sqlite_snapshot_follows_the_server(client, tmp_path):
+    sink = SQLiteSink(str(tmp_path / "changes.db"))
+    engine = SyncEngine(client, sink, page_size=40)
+    engine.sync_doctype("Customer", FIELDS)
+    client.put("/api/resource/Customer/C-000010", {"title": "Changed"})
+    client.delete("/api/resource/Customer/C-000020")
+    engine.sync_doctype("Customer", FIELDS)
+
+    documents = dict(sink.db.execute("SELECT name, data FROM documents WHERE doctype = 'Customer'"))
+    sink.close()
+    assert len(documents) == 249
+    assert "C-000020" not in documents
+    assert json.loads(documents["C-000010"])["title"] == "Changed"
+
+def test_deletions_are_read_by_field_when_as_dict_is_ignored(server, client, tmp_path):
+    server.config.ignore_as_dict = True
+    sink = JsonLinesSink(str(tmp_path / "changes.jsonl"))
+    engine = SyncEngine(client, sink, page_size=40)
+    engine.sync_doctype("Customer", FIELDS)
+    client.delete("/api/resource/Customer/C-000020")
+    assert engine.sync_doctype("Customer", FIELDS) == {"upserts": 0, "deletes": 1}
+    sink.close()
+
+    with open(tmp_path / "changes.jsonl") as f:
+        deletes = [event for event in map(json.loads, f) if event["op"] == "delete"]
+    assert [event["name"] for event in deletes] == ["C-000020"]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+ERPNext Performance Profile Validation
+Checks that the running stack uses a src/overrides/compose.perf-<profile>.yaml
+profile (MariaDB, Redis, gunicorn and queue worker settings, read through
+docker) and that it meets the profile's throughput and latency targets,
+using the benchmark_api.py workload. Exits non-zero when a check fails.
+
+Examples:
+  docker compose -f docker-compose.yml -f src/overrides/compose.perf-small.yaml up -d
+  python3 validate_perf_profile.py small
+  python3 validate_perf_profile.py medium --duration 120 --no-docker
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+
+from benchmark_api import (DEFAULT_MIX, Workload, build_client, parse_mix, print_summary,
+                           run_benchmark, summarize)
+
+OVERRIDES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "overrides")
+
+# Targets each profile must meet on its reference host (see the override headers),
+# measured with the default list/get/create mix
+PROFILES = {
+    "small": {"concurrency": 8, "min_rps": 15, "max_p95_ms": 1000, "max_p99_ms": 2000, "max_error_rate": 0.01},
+    "medium": {"concurrency": 32, "min_rps": 50, "max_p95_ms": 1200, "max_p99_ms": 2500, "max_error_rate": 0.01},
+    "large": {"concurrency": 96, "min_rps": 150, "max_p95_ms": 1500, "max_p99_ms": 3000, "max_error_rate": 0.01},
+}
+
+def to_bytes(size):
+    """Convert MariaDB/Redis sizes such as 16G or 256mb to bytes"""
+    match = re.fullmatch(r"(\d+)\s*([kmg]?)b?", str(size).strip().lower())
+    if not match:
+        raise ValueError(f"Unrecognized size '{size}'")
+    return int(match.group(1)) * 1024 ** " kmg".index(match.group(2) or " ")
+
+def expected_settings(profile):
+    """Settings a profile override applies, read from its YAML"""
+    with open(os.path.join(OVERRIDES_DIR, f"compose.perf-{profile}.yaml")) as f:
+        text = f.read()
+
+    def find(pattern):
+        match = re.search(pattern, text)
+        if not match:
+            raise ValueError(f"compose.perf-{profile}.yaml has no match for {pattern}")
+        return match.group(1)
+
+    settings = {
+        "innodb_buffer_pool_size": to_bytes(find(r"--innodb-buffer-pool-size=(\S+)")),
+        "max_connections": int(find(r"--max-connections=(\d+)")),
+        "gunicorn_workers": int(find(r"--workers=(\d+)")),
+        "redis_maxmemory": to_bytes(find(r"(?m)^  redis:\n(?:    .*\n)*?.*--maxmemory (\S+)")),
+        "redis_maxmemory_policy": find(r"(?m)^  redis:\n(?:    .*\n)*?.*--maxmemory-policy (\S+)"),
+        "redis_cache_maxmemory": to_bytes(find(r"(?m)^  redis-cache:\n(?:    .*\n)*?.*--maxmemory (\S+)")),
+        "redis_cache_maxmemory_policy": find(r"(?m)^  redis-cache:\n(?:    .*\n)*?.*--maxmemory-policy (\S+)"),
+    }
+    for queue in ("short", "default", "long"):
+        settings[f"queue_{queue}_workers"] = int(find(rf"(?m)^  queue-{queue}:\n(?:    .*\n)*?\s+replicas: (\d+)"))
+    return settings
+
+def _docker(*args):
+    return subprocess.run(["docker", *args], capture_output=True, text=True, check=True, timeout=30).stdout.strip()
+
+def _container(service):
+    """Container ID of a compose service (first replica)"""
+    ids = _docker("ps", "-q", "--filter", f"label=com.docker.compose.service={service}").split()
+    if not ids:
+        raise RuntimeError(f"No running container for service '{service}'")
+    return ids[0]
+
+def live_settings():
+    """Read the same settings from the running containers"""
+    db = _container("db")
+    pool, connections = _docker(
+        "exec", db, "sh", "-c",
+        'mysql -uroot -p"$MYSQL_ROOT_PASSWORD" -N -e "SELECT @@innodb_buffer_pool_size, @@max_connections"',
+    ).split()
+    settings = {"innodb_buffer_pool_size": int(pool), "max_connections": int(connections)}
+
+    for service, prefix in (("redis", "redis"), ("redis-cache", "redis_cache")):
+        container = _container(service)
+        settings[f"{prefix}_maxmemory"] = int(_docker("exec", container, "redis-cli", "CONFIG", "GET",
+                                                      "maxmemory").split()[-1])
+        settings[f"{prefix}_maxmemory_policy"] = _docker("exec", container, "redis-cli", "CONFIG", "GET",
+                                                         "maxmemory-policy").split()[-1]
+
+    # docker top lists the gunicorn master as well as its workers
+    processes = _docker("top", _container("backend")).splitlines()[1:]
+    settings["gunicorn_workers"] = sum("gunicorn" in line for line in processes) - 1
+
+    for queue in ("short", "default", "long"):
+        settings[f"queue_{queue}_workers"] = len(_docker(
+            "ps", "-q", "--filter", f"label=com.docker.compose.service=queue-{queue}").split())
+    return settings
+
+def check_targets(summary, targets):
+    """List of failed target descriptions (empty when all are met)"""
+    totals = summary["totals"]
+    latency = totals["latency"]
+    checks = [
+        ("throughput", totals["throughput_rps"], ">=", targets["min_rps"], "rps"),
+        ("p95 latency", latency["p95_ms"], "<=", targets["max_p95_ms"], "ms"),
+        ("p99 latency", latency["p99_ms"], "<=", targets["max_p99_ms"], "ms"),
+        ("error rate", totals["error_rate"], "<=", targets["max_error_rate"], ""),
+    ]
+    failures = []
+    for name, actual, op, target, unit in checks:
+        ok = actual >= target if op == ">=" else actual <= target
+        print(f"   {'✅' if ok else '❌'} {name}: {actual}{unit} (target {op} {target}{unit})")
+        if not ok:
+            failures.append(f"{name} {actual}{unit} not {op} {target}{unit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a compose performance profile against the running stack")
+    parser.add_argument("profile", choices=sorted(PROFILES))
+    parser.add_argument("--url", default=os.environ.get('ERPNEXT_URL', "http://localhost:8080"))
+    parser.add_argument("--user", help="login with a session for this user (password from ERPNEXT_PASSWORD); "
+                                       "otherwise ERPNEXT_API_KEY/ERPNEXT_API_SECRET are used")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--doctype", default="User", help="DocType used by list/get operations")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="unmeasured seconds before the run")
+    parser.add_argument("--no-docker", action="store_true", help="skip reading settings from the containers")
+    parser.add_argument("--output", default=None, help="results file (default results/profile-<profile>-<time>.json)")
+    args = parser.parse_args()
+
+    targets = PROFILES[args.profile]
+    args.concurrency = targets["concurrency"]
+    failures = []
+
+    expected = expected_settings(args.profile)
+    live = None
+    if not args.no_docker:
+        print(f"\n🔎 Checking {args.profile} profile settings in the running containers")
+        try:
+            live = live_settings()
+        except (OSError, RuntimeError, ValueError, subprocess.SubprocessError) as e:
+            print(f"❌ Could not read container settings: {e}")
+            failures.append(f"settings unreadable: {e}")
+        for key, value in (live or {}).items():
+            ok = value == expected[key]
+            print(f"   {'✅' if ok else '❌'} {key}: {value} (profile {expected[key]})")
+            if not ok:
+                failures.append(f"{key} is {value}, profile sets {expected[key]}")
+
+    client = build_client(args)
+    if not client:
+        print("❌ Authentication failed")
+        sys.exit(1)
+
+    mix = parse_mix(args.mix)
+    workload = Workload(client, args.doctype)
+    if mix.get("get"):
+        workload.prepare()
+
+    label = f"profile-{args.profile}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    print(f"\n🏁 Running {label}: {args.concurrency} workers, {args.warmup:g}s warmup + {args.duration:g}s")
+    started = datetime.now().isoformat()
+    samples, errors, error_messages = run_benchmark(workload, mix, args.concurrency, args.duration,
+                                                    warmup=args.warmup)
+    summary = summarize(samples, errors, error_messages, args.duration)
+    result = {
+        'label': label,
+        'started': started,
+        'config': {'url': args.url, 'mix': mix, 'doctype': args.doctype, 'concurrency': args.concurrency,
+                   'rps': None, 'duration_s': args.duration, 'warmup_s': args.warmup},
+        **summary,
+        'profile': {'name': args.profile, 'targets': targets, 'expected_settings': expected,
+                    'live_settings': live},
+    }
+    print_summary(result)
+
+    print(f"\n🎯 {args.profile} targets")
+    failures += check_targets(summary, targets)
+    result['profile']['failures'] = failures
+
+    output = args.output or os.path.join("results", f"{label}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"✓ Results saved to: {output}")
+
+    workload.cleanup()
+    client.logout()
+
+    if failures:
+        print(f"\n❌ {args.profile} profile not validated: {len(failures)} check(s) failed")
+        sys.exit(1)
+    print(f"\n✅ {args.profile} profile validated")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Goodbye!")